@@ -10,5 +10,9 @@ if __name__ == "__main__":
     import streamlit.web.cli as stcli
     import sys
     
+    # --profile prints import and initialization time per component
+    if "--profile" in sys.argv:
+        os.environ["ATM_PROFILE_STARTUP"] = "1"
+    
     sys.argv = ["streamlit", "run", os.path.join(src_path, "app.py")]
-    sys.exit(stcli.main()) 
\ No newline at end of file
+    sys.exit(stcli.main())
\ No newline at end of file
@@ -0,0 +1,111 @@
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from config import AIRPORTS_PATH
+from profiling import profile
+
+EARTH_RADIUS_KM = 6371.0
+
+# Heuristics used to pick a likely destination and a coarse flight phase
+DESTINATION_CANDIDATES = 8        # nearest airports considered as a destination
+DESTINATION_MAX_BEARING = 30.0    # degrees between heading and airport bearing
+TERMINAL_ALTITUDE = 3000.0        # meters
+TERMINAL_RADIUS_KM = 40.0
+
+PHASES = ['en_route', 'ground', 'terminal']
+FEATURE_COLUMNS = ['nearest_airport', 'nearest_airport_km', 'likely_destination',
+                   'distance_to_dest', 'flight_phase']
+
+class AirportIndex:
+    def __init__(self, airports_path=AIRPORTS_PATH):
+        """Load the bundled airport dataset and build a haversine BallTree over it."""
+        from sklearn.neighbors import BallTree
+
+        self.airports = pd.read_csv(airports_path)
+        self.codes = self.airports['icao'].to_numpy()
+        self.coords = np.radians(self.airports[['latitude', 'longitude']].to_numpy(dtype=np.float64))
+        self.tree = BallTree(self.coords, metric='haversine')
+
+    def features(self, latitude, longitude, heading, altitude, on_ground):
+        """
+        Airport-derived features for arrays of positions (degrees, meters).
+        Returns (nearest airport index, nearest km, destination index, destination km, phase code).
+        """
+        n_rows = len(latitude)
+        lat = np.radians(np.asarray(latitude, dtype=np.float64))
+        lon = np.radians(np.asarray(longitude, dtype=np.float64))
+        heading = np.asarray(heading, dtype=np.float64)
+        altitude = np.asarray(altitude, dtype=np.float64)
+        on_ground = np.asarray(on_ground, dtype=bool)
+
+        # k nearest airports for every aircraft (distances in radians, sorted ascending)
+        k = min(DESTINATION_CANDIDATES, len(self.codes))
+        dist, idx = self.tree.query(np.column_stack([lat, lon]), k=k)
+        dist_km = dist * EARTH_RADIUS_KM
+
+        # Initial bearing from each aircraft to each candidate airport
+        cand_lat = self.coords[idx, 0]
+        cand_lon = self.coords[idx, 1]
+        d_lon = cand_lon - lon[:, np.newaxis]
+        y = np.sin(d_lon) * np.cos(cand_lat)
+        x = (np.cos(lat[:, np.newaxis]) * np.sin(cand_lat)
+             - np.sin(lat[:, np.newaxis]) * np.cos(cand_lat) * np.cos(d_lon))
+        bearing = (np.degrees(np.arctan2(y, x)) + 360.0) % 360.0
+        off_track = np.abs((bearing - heading[:, np.newaxis] + 180.0) % 360.0 - 180.0)
+
+        # Likely destination: closest candidate ahead of the aircraft, else the nearest airport.
+        # Aircraft on the ground are assigned the airport they are at.
+        ahead = (off_track <= DESTINATION_MAX_BEARING) & ~on_ground[:, np.newaxis]
+        has_ahead = ahead.any(axis=1)
+        choice = np.where(has_ahead, np.argmax(ahead, axis=1), 0)
+        rows = np.arange(n_rows)
+        dest_idx = idx[rows, choice]
+        dest_km = dist_km[rows, choice]
+
+        nearest_km = dist_km[:, 0]
+        phase_code = np.select(
+            [on_ground,
+             (altitude < TERMINAL_ALTITUDE) & (nearest_km < TERMINAL_RADIUS_KM)],
+            [PHASES.index('ground'), PHASES.index('terminal')],
+            default=PHASES.index('en_route')
+        )
+        return idx[:, 0], nearest_km, dest_idx, dest_km, phase_code
+
+    def annotate(self, flights_df):
+        """
+        Compute airport-derived features for a whole snapshot in one vectorized call.
+        Returns a DataFrame aligned with flights_df.
+        """
+        n_rows = len(flights_df)
+        if n_rows == 0:
+            return pd.DataFrame(columns=FEATURE_COLUMNS, index=flights_df.index)
+
+        def column(name, dtype):
+            if name in flights_df:
+                return flights_df[name].to_numpy(dtype=dtype)
+            return np.zeros(n_rows, dtype=dtype)
+
+        nearest_idx, nearest_km, dest_idx, dest_km, phase_code = self.features(
+            column('latitude', np.float64),
+            column('longitude', np.float64),
+            column('heading', np.float64),
+            column('altitude', np.float64),
+            column('on_ground', bool)
+        )
+        return self.to_frame(nearest_idx, nearest_km, dest_idx, dest_km, phase_code, flights_df.index)
+
+    def to_frame(self, nearest_idx, nearest_km, dest_idx, dest_km, phase_code, index=None):
+        """Turn feature arrays into labelled columns."""
+        return pd.DataFrame({
+            'nearest_airport': self.codes[nearest_idx],
+            'nearest_airport_km': nearest_km,
+            'likely_destination': self.codes[dest_idx],
+            'distance_to_dest': dest_km,
+            'flight_phase': np.array(PHASES)[phase_code]
+        }, index=index)
+
+@lru_cache(maxsize=1)
+def get_airport_index():
+    """Return the process-wide airport index, building it on first use."""
+    with profile("init AirportIndex"):
+        return AirportIndex()
@@ -0,0 +1,185 @@
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from config import ANOMALY_MAX_AIRCRAFT, ANOMALY_AIRCRAFT_TTL
+
+# Detection thresholds
+RAPID_DESCENT_RATE = 30.0        # m/s sink rate (~6000 ft/min)
+RAPID_DESCENT_DROP = 2500.0      # m lost relative to the windowed maximum altitude
+SPEED_CHANGE_SIGMA = 4.0         # deviations from the EWMA speed
+SPEED_CHANGE_MIN = 50.0          # m/s, ignore smaller changes regardless of variance
+MAX_PLAUSIBLE_SPEED = 400.0      # m/s implied between two positions
+MIN_JUMP_DISTANCE_KM = 5.0
+GROUND_FLIP_COUNT = 2            # ground/air transitions ...
+GROUND_FLIP_WINDOW = 300         # ... within this many seconds
+EWMA_ALPHA = 0.3
+WINDOW_SECONDS = 120             # span of the windowed min/max altitude
+MIN_SAMPLES = 3                  # samples before speed statistics are trusted
+ALERT_COOLDOWN = 300             # seconds before the same alert is raised again for an aircraft
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two positions in kilometers."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * 6371.0 * math.asin(math.sqrt(a))
+
+class _AircraftStats:
+    __slots__ = ('samples', 'last_time', 'last_seen', 'latitude', 'longitude', 'altitude',
+                 'altitude_time', 'on_ground', 'speed_mean', 'speed_var', 'vertical_rate',
+                 'alt_max', 'alt_min', 'flips', 'raised')
+
+    def __init__(self, flight, now):
+        """Rolling statistics for one aircraft, seeded with its first state vector."""
+        self.samples = 1
+        self.last_time = flight['timestamp']
+        self.last_seen = now
+        self.latitude = flight['latitude']
+        self.longitude = flight['longitude']
+        self.altitude = flight['altitude']
+        self.on_ground = flight['on_ground']
+        self.speed_mean = flight['velocity']
+        self.speed_var = 0.0
+        self.vertical_rate = 0.0
+        # Monotonic deques of (timestamp, altitude) give O(1) amortized windowed max/min.
+        # altitude_time is when the last valid altitude was seen (None until there is one).
+        self.alt_max = deque()
+        self.alt_min = deque()
+        self.altitude_time = None
+        if self.altitude > 0 or self.on_ground:
+            self.altitude_time = self.last_time
+            self._push_altitude(self.last_time, self.altitude)
+        self.flips = deque(maxlen=GROUND_FLIP_COUNT)
+        self.raised = None  # alert type -> timestamp, created on the first alert
+
+    def _push_altitude(self, timestamp, altitude):
+        """Add an altitude sample to the windowed min/max."""
+        while self.alt_max and self.alt_max[-1][1] <= altitude:
+            self.alt_max.pop()
+        self.alt_max.append((timestamp, altitude))
+        while self.alt_min and self.alt_min[-1][1] >= altitude:
+            self.alt_min.pop()
+        self.alt_min.append((timestamp, altitude))
+        for window in (self.alt_max, self.alt_min):
+            while window[0][0] < timestamp - WINDOW_SECONDS:
+                window.popleft()
+
+    def _cooled_down(self, alert_type, timestamp):
+        """Check whether an alert type may be raised again, and record it if so."""
+        if self.raised is None:
+            self.raised = {}
+        last = self.raised.get(alert_type)
+        if last is not None and timestamp - last < ALERT_COOLDOWN:
+            return False
+        self.raised[alert_type] = timestamp
+        return True
+
+    def update(self, flight, now):
+        """Fold in a new state vector and return a list of (alert_type, value) pairs."""
+        dt = flight['timestamp'] - self.last_time
+        if dt <= 0:
+            return []  # same or older state vector (e.g. seen through an overlapping region)
+
+        alerts = []
+        altitude = flight['altitude']
+        velocity = flight['velocity']
+        on_ground = flight['on_ground']
+
+        # Position jump: implied ground speed between consecutive positions
+        distance_km = _haversine_km(self.latitude, self.longitude, flight['latitude'], flight['longitude'])
+        implied_speed = distance_km * 1000 / dt
+        if distance_km > MIN_JUMP_DISTANCE_KM and implied_speed > MAX_PLAUSIBLE_SPEED:
+            alerts.append(('position_jump', implied_speed))
+
+        # Rapid descent: instantaneous sink rate or drop from the windowed maximum.
+        # Missing values arrive as 0 from get_states, so they are not treated as readings.
+        self.samples += 1
+        if altitude > 0 or on_ground:
+            # Rate over the time since the last valid altitude, not the last state vector,
+            # so a gap of missing altitudes is not read as a one-interval drop
+            if self.altitude_time is not None:
+                self.vertical_rate = (altitude - self.altitude) / (flight['timestamp'] - self.altitude_time)
+            self._push_altitude(flight['timestamp'], altitude)
+            if not on_ground and (self.vertical_rate < -RAPID_DESCENT_RATE or
+                                  self.alt_max[0][1] - altitude > RAPID_DESCENT_DROP):
+                alerts.append(('rapid_descent', self.vertical_rate))
+            self.altitude = altitude
+            self.altitude_time = flight['timestamp']
+
+        # Unusual speed change against the exponentially weighted mean and variance
+        if velocity > 0:
+            deviation = velocity - self.speed_mean
+            if self.samples > MIN_SAMPLES and abs(deviation) > max(
+                    SPEED_CHANGE_SIGMA * math.sqrt(self.speed_var), SPEED_CHANGE_MIN):
+                alerts.append(('speed_change', deviation))
+            self.speed_mean += EWMA_ALPHA * deviation
+            self.speed_var = (1 - EWMA_ALPHA) * (self.speed_var + EWMA_ALPHA * deviation ** 2)
+
+        # Repeated ground/air transitions within a short window
+        if on_ground != self.on_ground:
+            self.flips.append(flight['timestamp'])
+            if (len(self.flips) == GROUND_FLIP_COUNT and
+                    self.flips[-1] - self.flips[0] <= GROUND_FLIP_WINDOW):
+                alerts.append(('ground_air_flip', float(len(self.flips))))
+
+        self.last_time = flight['timestamp']
+        self.last_seen = now
+        self.latitude = flight['latitude']
+        self.longitude = flight['longitude']
+        self.on_ground = on_ground
+        return [(t, v) for t, v in alerts if self._cooled_down(t, flight['timestamp'])]
+
+class AnomalyDetector:
+    def __init__(self, max_aircraft=ANOMALY_MAX_AIRCRAFT, aircraft_ttl=ANOMALY_AIRCRAFT_TTL, max_alerts=500):
+        """Streaming per-aircraft anomaly detection over successive state vector snapshots."""
+        self.max_aircraft = max_aircraft
+        self.aircraft_ttl = aircraft_ttl
+        self.stats = OrderedDict()  # least recently seen first
+        self.recent_alerts = deque(maxlen=max_alerts)
+        self._lock = threading.Lock()  # snapshots arrive from the poller while pages read alerts
+
+    def recent(self):
+        """Copy of the recent alerts, oldest first."""
+        with self._lock:
+            return list(self.recent_alerts)
+
+    def process(self, flights, now=None):
+        """Update statistics with one snapshot (list of state dicts) and return new alerts."""
+        with self._lock:
+            return self._process(flights, now or time.time())
+
+    def _process(self, flights, now):
+        """Fold a snapshot into the per-aircraft statistics; called with the lock held."""
+        alerts = []
+        for flight in flights:
+            icao24 = flight.get('icao24')
+            if not icao24:
+                continue
+            stats = self.stats.get(icao24)
+            if stats is None:
+                self.stats[icao24] = _AircraftStats(flight, now)
+                continue
+            self.stats.move_to_end(icao24)
+            for alert_type, value in stats.update(flight, now):
+                alerts.append({
+                    'icao24': icao24,
+                    'callsign': flight.get('callsign'),
+                    'alert_type': alert_type,
+                    'value': float(value),
+                    'latitude': flight['latitude'],
+                    'longitude': flight['longitude'],
+                    'detected_at': flight['timestamp']
+                })
+
+        self._evict(now)
+        self.recent_alerts.extend(alerts)
+        return alerts
+
+    def _evict(self, now):
+        """Drop aircraft not seen within the TTL and cap the number tracked."""
+        while self.stats:
+            icao24, stats = next(iter(self.stats.items()))
+            if now - stats.last_seen <= self.aircraft_ttl and len(self.stats) <= self.max_aircraft:
+                break
+            self.stats.popitem(last=False)
@@ -1,16 +1,38 @@
-import streamlit as st
-import folium
-from streamlit_folium import folium_static
-import plotly.express as px
-import pandas as pd
-from datetime import datetime
-import time
-import numpy as np
+from profiling import profile, lazy_import
 
-from opensky_client import OpenSkyClient
-from predictor import DelayPredictor
-from database import init_db, store_flight_data, get_recent_flights, store_prediction
-from config import MAP_CENTER, MAP_ZOOM, REFRESH_INTERVAL
+# Heavy visualization modules (folium, plotly) are imported on first use via lazy_import
+with profile("import core modules"):
+    import streamlit as st
+    import streamlit.components.v1 as components
+    import pandas as pd
+    from datetime import datetime
+    import time
+    import json
+    import threading
+    import tempfile
+    import numpy as np
+
+with profile("import app modules"):
+    from opensky_client import OpenSkyClient
+    from predictor import DelayPredictor
+    from regions import RegionScheduler, CUSTOM_PREFIX
+    from pipeline import build_snapshot_frame, ShardedPipeline
+    from live_server import LiveUpdateHub
+    from live_map import render_live_map
+    from density import DensityGrid
+    from occupancy import SectorOccupancy
+    from search_index import FlightSearchIndex
+    from snapshot import SnapshotHistory, AircraftRecord, memory_report
+    from anomaly import AnomalyDetector
+    from export import FORMATS, EXTENSIONS, export_frame, export_table
+    from database import (
+        init_db, create_snapshot, store_flight_data, store_predictions, store_alerts,
+        store_sector_occupancy, get_sector_occupancy
+    )
+    from config import (
+        MAP_CENTER, MAP_ZOOM, REFRESH_INTERVAL, LIVE_SERVER_URL,
+        SNAPSHOT_HISTORY_SIZE, TRACK_DRILLDOWN_LIMIT, PIPELINE_WORKERS, EXPORT_DASHBOARD_MAX_ROWS
+    )
 
 # Custom CSS for better styling
 def local_css():
@@ -85,40 +107,164 @@ def local_css():
     </style>
     """, unsafe_allow_html=True)
 
-def create_map(flights_df):
+@st.cache_resource
+def get_database():
+    """Create the database schema once per process."""
+    with profile("init database"):
+        init_db()
+    return True
+
+@st.cache_resource
+def get_delay_predictor():
+    """Load (or train) the delay model once per process and share it across sessions."""
+    with profile("init DelayPredictor"):
+        return DelayPredictor()
+
+@st.cache_resource
+def get_pipeline():
+    """Start the sharded scoring pool once per process; None when running single-core."""
+    if PIPELINE_WORKERS <= 1:
+        return None
+    with profile("start ShardedPipeline"):
+        return ShardedPipeline(PIPELINE_WORKERS)
+
+@st.cache_resource
+def get_region_scheduler():
+    """Create one region scheduler per process so all sessions share the request budget."""
+    get_database()
+    with profile("init OpenSkyClient"):
+        client = OpenSkyClient()
+    # Each fetched snapshot is stored once, however many regions or sessions reuse it
+    return RegionScheduler(client, on_fetch=handle_fetched_snapshot)
+
+@st.cache_resource
+def get_anomaly_detector():
+    """Per-aircraft rolling statistics shared by all sessions."""
+    return AnomalyDetector()
+
+def handle_fetched_snapshot(region, flights, fetched_at):
+    """Store a freshly fetched snapshot under a new poll ID and run it through anomaly detection."""
+    poll_id = create_snapshot(region.name, region.bounds, len(flights), fetched_at)
+    store_flight_data(flights, poll_id)
+    store_alerts(get_anomaly_detector().process(flights, fetched_at), poll_id)
+    return poll_id
+
+@st.cache_resource
+def get_live_hub():
+    """Start the live update server once per process; returns None if it cannot start."""
+    predictor = get_delay_predictor()
+    hub = LiveUpdateHub(
+        get_region_scheduler(),
+        lambda flights: build_snapshot_frame(flights, predictor, get_pipeline()),
+        on_publish=record_snapshot
+    )
+    with profile("start live update server"):
+        return hub if hub.start() else None
+
+@st.cache_resource
+def get_snapshot_history():
+    """Recent compact snapshots shared by all sessions."""
+    return SnapshotHistory(SNAPSHOT_HISTORY_SIZE)
+
+@st.cache_resource
+def get_record_lock():
+    """Lock serializing snapshot recording across sessions and the live poller thread."""
+    return threading.Lock()
+
+def record_snapshot(region_name, snapshot, df):
+    """Keep a new region snapshot in memory and fold it into the density grid and sector occupancy."""
+    history = get_snapshot_history()
+    # The "already recorded" checks and the updates run as one step, so a snapshot is
+    # folded in once even when sessions and the poller record it at the same time
+    with get_record_lock():
+        if snapshot.poll_id is not None and (region_name, snapshot.fetched_at) not in history.snapshots:
+            # Predictions are stored against the poll that produced the scored state vectors
+            store_predictions(snapshot.poll_id, df)
+        history.add(region_name, snapshot.fetched_at, df)
+        return update_density_grid(region_name, snapshot, df), update_sector_occupancy(region_name, snapshot, df)
+
+@st.cache_resource
+def get_density_grids():
+    """Density grids per region, shared across sessions."""
+    return {}
+
+def update_density_grid(region_name, snapshot, df):
+    """Bin a new region snapshot into that region's density grid."""
+    grids = get_density_grids()
+    region = get_region_scheduler().regions.get(region_name)
+    grid = grids.get(region_name)
+    if region is None:
+        return grid  # removed while a snapshot of it was in flight
+    if grid is None or grid.bounds != region.bounds:
+        grid = grids[region_name] = DensityGrid(region.bounds)
+    if grid.last_timestamp != snapshot.fetched_at and not df.empty:
+        grid.update(df, snapshot.fetched_at)
+    return grid
+
+@st.cache_resource
+def get_occupancy_engines():
+    """Sector occupancy per region, shared across sessions."""
+    return {}
+
+def update_sector_occupancy(region_name, snapshot, df):
+    """Assign a new region snapshot to sectors and persist finished rollups."""
+    engines = get_occupancy_engines()
+    region = get_region_scheduler().regions.get(region_name)
+    occupancy = engines.get(region_name)
+    if region is None:
+        return occupancy  # removed while a snapshot of it was in flight
+    if occupancy is None or occupancy.bounds != region.bounds:
+        occupancy = engines[region_name] = SectorOccupancy(region.bounds)
+    if occupancy.last_timestamp != snapshot.fetched_at and not df.empty:
+        occupancy.update(df, snapshot.fetched_at)
+        store_sector_occupancy(region_name, occupancy.flush_rollups())
+    return occupancy
+
+def prune_region_state(scheduler):
+    """Drop per-region grids of regions (e.g. old custom boxes) that are no longer registered."""
+    with get_record_lock():
+        for engines in (get_density_grids(), get_occupancy_engines()):
+            for region_name in [name for name in list(engines) if name not in scheduler.regions]:
+                engines.pop(region_name, None)
+
+def create_map(flights_df, center=MAP_CENTER):
     """Create a folium map with flight markers."""
+    folium = lazy_import('folium')
+    
     # Create the map centered on the specified location
-    m = folium.Map(location=MAP_CENTER, zoom_start=MAP_ZOOM, control_scale=True)
+    m = folium.Map(location=center, zoom_start=MAP_ZOOM, control_scale=True)
     
     # Add markers for each flight
-    for _, flight in flights_df.iterrows():
+    for flight in AircraftRecord.iter_snapshot(flights_df):
         try:
+            delay_probability = flight.delay_probability or 0
             # Create popup content with improved styling
             popup_content = f"""
                 <div style='font-family: Arial, sans-serif; padding: 10px;'>
                     <h4 style='margin-bottom: 10px; color: #1E1E1E;'>Flight Information</h4>
                     <table style='width: 100%;'>
-                        <tr><td><b>Callsign:</b></td><td>{flight['callsign']}</td></tr>
-                        <tr><td><b>Country:</b></td><td>{flight['origin_country']}</td></tr>
-                        <tr><td><b>Altitude:</b></td><td>{flight['altitude']:.0f}m</td></tr>
-                        <tr><td><b>Velocity:</b></td><td>{flight['velocity']:.0f}m/s</td></tr>
-                        <tr><td><b>Delay Prob:</b></td><td>{flight.get('delay_probability', 0):.1%}</td></tr>
+                        <tr><td><b>Callsign:</b></td><td>{flight.callsign}</td></tr>
+                        <tr><td><b>Country:</b></td><td>{flight.origin_country}</td></tr>
+                        <tr><td><b>Altitude:</b></td><td>{flight.altitude:.0f}m</td></tr>
+                        <tr><td><b>Velocity:</b></td><td>{flight.velocity:.0f}m/s</td></tr>
+                        <tr><td><b>Destination:</b></td><td>{flight.likely_destination or 'N/A'} ({flight.distance_to_dest or 0:.0f}km)</td></tr>
+                        <tr><td><b>Delay Prob:</b></td><td>{delay_probability:.1%}</td></tr>
                     </table>
                 </div>
             """
             
             # Add marker to map with custom icon
             folium.CircleMarker(
-                location=[float(flight['latitude']), float(flight['longitude'])],
+                location=[float(flight.latitude), float(flight.longitude)],
                 radius=6,
                 popup=folium.Popup(popup_content, max_width=300),
-                color='red' if flight.get('delay_probability', 0) > 0.5 else 'blue',
+                color='red' if delay_probability > 0.5 else 'blue',
                 fill=True,
                 fill_opacity=0.7,
                 weight=2
             ).add_to(m)
         except Exception as e:
-            st.error(f"Error adding marker for flight {flight.get('callsign')}: {str(e)}")
+            st.error(f"Error adding marker for flight {flight.callsign}: {str(e)}")
             continue
     
     return m
@@ -159,20 +305,28 @@ def display_metrics(df):
         </div>
         """.format(df['origin_country'].nunique()), unsafe_allow_html=True)
 
-def filter_flights(df, min_altitude=None, min_velocity=None, country=None, delay_threshold=None):
-    """Filter flights based on criteria."""
-    filtered_df = df.copy()
+@st.cache_resource(max_entries=8)
+def get_search_index(region_name, fetched_at, _df):
+    """Build the callsign/country search index once per region snapshot."""
+    return FlightSearchIndex(_df)
+
+def filter_flights(df, min_altitude=None, min_velocity=None, country=None, delay_threshold=None, index=None):
+    """Filter flights based on criteria and return the matching row positions."""
+    mask = np.ones(len(df), dtype=bool)
     
     if min_altitude:
-        filtered_df = filtered_df[filtered_df['altitude'] >= min_altitude]
+        mask &= df['altitude'].to_numpy() >= min_altitude
     if min_velocity:
-        filtered_df = filtered_df[filtered_df['velocity'] >= min_velocity]
+        mask &= df['velocity'].to_numpy() >= min_velocity
     if country:
-        filtered_df = filtered_df[filtered_df['origin_country'].str.contains(country, case=False, na=False)]
+        index = index or FlightSearchIndex(df)
+        country_mask = np.zeros(len(df), dtype=bool)
+        country_mask[index.country(country)] = True
+        mask &= country_mask
     if delay_threshold:
-        filtered_df = filtered_df[filtered_df['delay_probability'] >= delay_threshold]
+        mask &= df['delay_probability'].to_numpy() >= delay_threshold
     
-    return filtered_df
+    return np.flatnonzero(mask)
 
 def calculate_statistics(df):
     """Calculate advanced statistics."""
@@ -189,13 +343,15 @@ def calculate_statistics(df):
     }
     return stats
 
-def create_heatmap(df):
-    """Create a heatmap of flight density."""
-    return px.density_mapbox(df, 
+def create_heatmap(grid_df, center=MAP_CENTER):
+    """Create a heatmap of flight density from pre-aggregated grid cells."""
+    px = lazy_import('plotly.express')
+    return px.density_mapbox(grid_df, 
                            lat='latitude', 
                            lon='longitude', 
+                           z='count',
                            radius=10,
-                           center=dict(lat=MAP_CENTER[0], lon=MAP_CENTER[1]), 
+                           center=dict(lat=center[0], lon=center[1]), 
                            zoom=5,
                            mapbox_style="stamen-terrain")
 
@@ -234,18 +390,19 @@ def calculate_advanced_analytics(df):
     }
     return stats
 
-def create_advanced_visualizations(df):
+def create_advanced_visualizations(df, grid_df, center=MAP_CENTER):
     """Create advanced visualizations for analytics."""
+    px = lazy_import('plotly.express')
     visualizations = {}
     
-    # Flight Distribution Map
+    # Flight Distribution Map, rendered from the density grid rather than raw points
     visualizations['density_map'] = px.density_mapbox(
-        df,
+        grid_df,
         lat='latitude',
         lon='longitude',
-        z='delay_probability',
+        z='delay_sum',
         radius=20,
-        center=dict(lat=MAP_CENTER[0], lon=MAP_CENTER[1]),
+        center=dict(lat=center[0], lon=center[1]),
         zoom=4,
         mapbox_style="stamen-terrain",
         title="Flight Risk Distribution Heatmap",
@@ -279,19 +436,21 @@ def create_advanced_visualizations(df):
     
     return visualizations
 
-def display_advanced_analytics(df):
+def display_advanced_analytics(df, grid_df, center=MAP_CENTER, occupancy=None, region_name=None):
     """Display advanced analytics section."""
+    px = lazy_import('plotly.express')
     st.markdown("<div class='chart-container'>", unsafe_allow_html=True)
     
     # Analytics Navigation
     analysis_type = st.selectbox(
         "Select Analysis Type",
-        ["Risk Assessment", "Performance Metrics", "Geographical Analysis", "Custom Analysis"]
+        ["Risk Assessment", "Performance Metrics", "Geographical Analysis", "Sector Occupancy",
+         "Custom Analysis"]
     )
     
     # Calculate statistics
     stats = calculate_advanced_analytics(df)
-    visualizations = create_advanced_visualizations(df)
+    visualizations = create_advanced_visualizations(df, grid_df, center)
     
     if analysis_type == "Risk Assessment":
         st.subheader("🎯 Flight Risk Assessment")
@@ -334,8 +493,9 @@ def display_advanced_analytics(df):
                      f"{stats['operational_metrics']['avg_velocity']:.0f}m/s",
                      delta="Cruising Speed")
         with perf_col3:
-            st.metric("Total Distance Covered", 
-                     f"{len(df) * stats['operational_metrics']['avg_velocity']:.0f}m",
+            # Combined ground speed of all aircraft, expressed as distance flown per hour
+            st.metric("Distance Flown per Hour", 
+                     f"{df['velocity'].sum() * 3.6:,.0f}km",
                      delta="Combined")
         
     elif analysis_type == "Geographical Analysis":
@@ -363,6 +523,45 @@ def display_advanced_analytics(df):
             # Coverage Map
             st.plotly_chart(visualizations['density_map'], use_container_width=True)
             
+    elif analysis_type == "Sector Occupancy":
+        st.subheader("🛰️ Sector Occupancy")
+        
+        if occupancy is None or not occupancy.history:
+            st.info("Sector occupancy is available after the first snapshot.")
+        else:
+            current = occupancy.current()
+            totals = occupancy.totals()
+            
+            occ_col1, occ_col2, occ_col3 = st.columns(3)
+            with occ_col1:
+                st.metric("Aircraft in Sectors", int(totals['aircraft'].iloc[-1]))
+            with occ_col2:
+                st.metric("Occupied Sectors", int((current['count'] > 0).sum()))
+            with occ_col3:
+                st.metric("Busiest Sector", current['sector'].iloc[0],
+                         delta=f"{current['count'].iloc[0]} aircraft")
+            
+            # Latest poll per sector
+            st.dataframe(current.head(20), use_container_width=True)
+            
+            # Rolling in-memory time series
+            fig_totals = px.line(totals, x='time', y='aircraft', title="Aircraft in Region per Poll")
+            st.plotly_chart(fig_totals, use_container_width=True)
+            fig_sectors = px.line(occupancy.series(), x='time', y='count', color='sector',
+                                  hover_data=['entries', 'exits'], title="Busiest Sectors")
+            st.plotly_chart(fig_sectors, use_container_width=True)
+            
+            # Stored rollups cover the last day, including before this process started
+            rollups = get_sector_occupancy(region_name, time.time() - 24 * 3600)
+            if not rollups.empty:
+                top_sectors = rollups.groupby('sector')['max_count'].max().nlargest(10).index
+                rollups = rollups[rollups['sector'].isin(top_sectors)].assign(
+                    time=lambda r: pd.to_datetime(r['bucket_start'], unit='s'))
+                fig_day = px.line(rollups, x='time', y='mean_count', color='sector',
+                                  hover_data=['max_count', 'entries', 'exits'],
+                                  title="Sector Load, Last 24 Hours (Top 10 by Peak)")
+                st.plotly_chart(fig_day, use_container_width=True)
+    
     else:  # Custom Analysis
         st.subheader("🔍 Custom Analysis")
         
@@ -400,14 +599,15 @@ def display_advanced_analytics(df):
             
             # Export Option
             if st.button("📥 Export Analysis"):
+                # pandas serializes NaN as null, keeping the report valid JSON
                 analysis_data = {
-                    'correlation': correlation.to_dict(),
-                    'summary_stats': df[params].describe().to_dict(),
+                    'correlation': json.loads(correlation.to_json()),
+                    'summary_stats': json.loads(df[params].describe().to_json()),
                     'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 }
                 st.download_button(
                     label="Download Analysis Report",
-                    data=str(analysis_data),
+                    data=json.dumps(analysis_data, indent=2),
                     file_name="flight_analysis_report.json",
                     mime="application/json"
                 )
@@ -434,10 +634,9 @@ def main():
     </div>
     """, unsafe_allow_html=True)
     
-    # Initialize components
-    opensky_client = OpenSkyClient()
-    delay_predictor = DelayPredictor()
-    init_db()
+    # Initialize components (cached once per process, shared across sessions)
+    scheduler = get_region_scheduler()
+    delay_predictor = get_delay_predictor()
     
     # Sidebar
     with st.sidebar:
@@ -447,26 +646,42 @@ def main():
         
         # Region selection
         st.subheader("🌍 Region Settings")
-        region = st.selectbox("Select Region", ["France", "Europe", "North America", "Custom"])
+        region_names = [name for name in scheduler.regions if not name.startswith(CUSTOM_PREFIX)]
+        region_name = st.selectbox("Select Region", region_names + ["Custom"])
         
-        if region == "Custom":
-            st.number_input("Min Latitude", value=MAP_CENTER[0]-5)
-            st.number_input("Max Latitude", value=MAP_CENTER[0]+5)
-            st.number_input("Min Longitude", value=MAP_CENTER[1]-5)
-            st.number_input("Max Longitude", value=MAP_CENTER[1]+5)
+        if region_name == "Custom":
+            custom_bounds = [
+                st.number_input("Min Latitude", value=MAP_CENTER[0]-5),
+                st.number_input("Max Latitude", value=MAP_CENTER[0]+5),
+                st.number_input("Min Longitude", value=MAP_CENTER[1]-5),
+                st.number_input("Max Longitude", value=MAP_CENTER[1]+5)
+            ]
+            # Each distinct box is its own shared region, so sessions never overwrite each other's box
+            region = scheduler.custom_region(custom_bounds)
+            prune_region_state(scheduler)
+        else:
+            region = scheduler.regions[region_name]
         
         # Refresh settings
         st.subheader("🔄 Refresh Settings")
         auto_refresh = st.checkbox("Auto Refresh", value=True)
         if auto_refresh:
-            refresh_interval = st.slider("Refresh Interval (seconds)", 
+            # Only sets how often this page reruns; regions are shared by all viewers
+            # and the poller, so their data refresh on the region's own interval
+            refresh_interval = st.slider("Page Refresh Interval (seconds)", 
                                       min_value=30, 
                                       max_value=300, 
-                                      value=REFRESH_INTERVAL)
+                                      value=min(max(region.refresh_interval, 30), 300))
+            st.caption(f"Flight data for this region refreshes every {region.refresh_interval}s.")
+        live_hub = get_live_hub() if auto_refresh else None
         
         # View options
         st.subheader("🎯 View Options")
         view_mode = st.radio("Map View", ["Standard", "Heatmap", "Satellite"])
+        if view_mode == "Heatmap":
+            heatmap_window = st.radio("Heatmap Window", ["Current Snapshot", "History Window"])
+        # The live map updates itself in the browser, so the page is not rerun while it is shown
+        streaming = live_hub is not None and view_mode != "Heatmap"
         
         # Filters
         st.subheader("🔍 Filters")
@@ -493,36 +708,58 @@ def main():
         with col1:
             refresh = st.button("🔄 Refresh Data")
         with col2:
-            st.text(f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            last_updated = st.empty()
         
         if refresh or auto_refresh:
             with st.spinner("Fetching flight data..."):
-                flights = opensky_client.get_states()
+                # Served from the region's shared snapshot unless it is due for a refresh
+                snapshot = scheduler.get_snapshot(region.name, force=refresh)
+                flights = snapshot.flights if snapshot else []
+                if snapshot:
+                    fetched_at = datetime.fromtimestamp(snapshot.fetched_at).strftime('%Y-%m-%d %H:%M:%S')
+                    label = "Statistics as of" if streaming else "Last updated"
+                    last_updated.text(f"{label}: {fetched_at} ({snapshot.source_region})")
                 
                 if flights:
                     try:
-                        # Create DataFrame
-                        df = pd.DataFrame(flights)
-                        
-                        # Get delay predictions
-                        df['delay_probability'] = df.apply(
-                            lambda x: delay_predictor.predict_delay(x),
-                            axis=1
-                        )
-                        
-                        # Store data
-                        store_flight_data(flights)
+                        # Scored once per snapshot; reruns (e.g. each search keystroke) reuse it
+                        df = get_snapshot_history().get(region.name, snapshot.fetched_at)
+                        if df is None:
+                            df = build_snapshot_frame(flights, delay_predictor, get_pipeline())
+                        if live_hub is not None:
+                            # Same path as the live poller: published and recorded once per snapshot
+                            live_hub.publish_snapshot(region.name, snapshot, df)
+                        density_grid, occupancy = record_snapshot(region.name, snapshot, df)
                         
                         # Display metrics
                         display_metrics(df)
+                        if streaming:
+                            st.caption(f"Metrics, charts and alerts show the snapshot of {fetched_at}. "
+                                       "The live map keeps updating; press Refresh Data to update the rest.")
                         
                         # Create and display map
                         st.markdown("<div class='chart-container'>", unsafe_allow_html=True)
-                        m = create_map(df)
-                        folium_static(m, width=1200, height=600)
+                        if view_mode == "Heatmap":
+                            window = 'history' if heatmap_window == "History Window" else 'current'
+                            cell_size = density_grid.select_level()
+                            if len(density_grid.cell_sizes) > 1:
+                                cell_size = st.select_slider("Heatmap Cell Size (degrees)",
+                                                             options=density_grid.cell_sizes, value=cell_size)
+                            st.plotly_chart(create_heatmap(density_grid.frame(cell_size, window), region.center),
+                                            use_container_width=True)
+                        elif streaming:
+                            # Markers are updated in the browser from streamed position deltas
+                            components.html(
+                                render_live_map(LIVE_SERVER_URL, region.name, region.center, MAP_ZOOM),
+                                height=630
+                            )
+                        else:
+                            m = create_map(df, region.center)
+                            lazy_import('streamlit_folium').folium_static(m, width=1200, height=600)
                         st.markdown("</div>", unsafe_allow_html=True)
                         
                         # Charts
+                        px = lazy_import('plotly.express')
                         col1, col2 = st.columns(2)
                         
                         with col1:
@@ -544,7 +781,7 @@ def main():
                             st.subheader("Top 10 Countries")
                             country_counts = df['origin_country'].value_counts().head(10)
                             fig = px.bar(
-                                x=country_counts.index,
+                                x=country_counts.index.astype(str),
                                 y=country_counts.values,
                                 labels={'x': 'Country', 'y': 'Number of Flights'},
                                 title='Flights by Country'
@@ -552,6 +789,29 @@ def main():
                             fig.update_layout(showlegend=False)
                             st.plotly_chart(fig, use_container_width=True)
                             st.markdown("</div>", unsafe_allow_html=True)
+                        
+                        # Most recent anomaly alerts across all regions
+                        recent_alerts = get_anomaly_detector().recent()
+                        with st.expander(f"🚨 Alerts ({len(recent_alerts)})"):
+                            if recent_alerts:
+                                alerts_df = pd.DataFrame(recent_alerts[::-1])
+                                alerts_df['detected_at'] = pd.to_datetime(alerts_df['detected_at'], unit='s')
+                                st.dataframe(alerts_df[['detected_at', 'callsign', 'icao24', 'alert_type', 'value']])
+                            else:
+                                st.info("No anomalies detected yet.")
+                        
+                        # Memory footprint of the live snapshot and the in-memory history
+                        with st.expander("💾 Memory Usage"):
+                            snapshot_report = memory_report(df)
+                            history_report = get_snapshot_history().memory_report()
+                            mem_col1, mem_col2 = st.columns(2)
+                            with mem_col1:
+                                st.metric("Bytes per Aircraft", f"{snapshot_report['bytes_per_aircraft']:.0f}")
+                                st.metric("Snapshot Size", f"{snapshot_report['total_bytes'] / 1024:.1f} KB")
+                            with mem_col2:
+                                st.metric("Snapshots in Memory", history_report['snapshots'])
+                                st.metric("History Size", f"{history_report['total_bytes'] / 1024:.1f} KB")
+                            st.dataframe(pd.Series(snapshot_report['by_column'], name='bytes'))
                     
                     except Exception as e:
                         st.error(f"Error processing flight data: {str(e)}")
@@ -571,12 +831,14 @@ def main():
         
         if 'df' in locals():
             # Filter and sort data
-            filtered_df = filter_flights(df, min_altitude, min_velocity, country_filter, delay_threshold)
+            search_index = get_search_index(region.name, snapshot.fetched_at, df)
+            positions = filter_flights(df, min_altitude, min_velocity, country_filter, delay_threshold,
+                                       index=search_index)
             if search_term:
-                filtered_df = filtered_df[
-                    filtered_df['callsign'].str.contains(search_term, case=False, na=False) |
-                    filtered_df['origin_country'].str.contains(search_term, case=False, na=False)
-                ]
+                positions = np.intersect1d(positions, search_index.search(search_term), assume_unique=True)
+            
+            # Only the matching rows are materialized, for display and export
+            filtered_df = df.iloc[positions]
             
             # Display results
             st.write(f"Found {len(filtered_df)} flights matching criteria")
@@ -590,21 +852,99 @@ def main():
                 height=400
             )
             
-            # Export options
-            if st.button("📥 Export Results"):
-                csv = filtered_df.to_csv(index=False)
-                st.download_button(
-                    label="Download CSV",
-                    data=csv,
-                    file_name="flight_data.csv",
-                    mime="text/csv"
+            # Track drill-down; tracks are fetched concurrently and cached locally
+            st.subheader("🛫 Flight Tracks")
+            # Anonymous access is limited to one request every 10 seconds, so far fewer tracks are offered
+            drilldown_limit = scheduler.client.track_drilldown_limit
+            aircraft = {
+                record.icao24: record
+                for record in AircraftRecord.iter_snapshot(filtered_df.iloc[:TRACK_DRILLDOWN_LIMIT])
+            }
+            track_options = list(aircraft)
+            if st.checkbox(f"Show tracks for the first results (up to {drilldown_limit})"):
+                selected_tracks = track_options[:drilldown_limit]
+            else:
+                selected_tracks = st.multiselect(
+                    "Select flights",
+                    track_options,
+                    max_selections=drilldown_limit,
+                    format_func=lambda icao24: f"{aircraft[icao24].callsign or icao24} ({icao24})"
                 )
+            
+            if selected_tracks:
+                # Current state of the selected aircraft
+                st.dataframe(pd.DataFrame([aircraft[icao24].to_dict() for icao24 in selected_tracks]),
+                             use_container_width=True)
+                with st.spinner("Loading tracks..."):
+                    tracks = scheduler.client.get_tracks(selected_tracks)
+                waypoints = pd.DataFrame([
+                    {
+                        'icao24': icao24,
+                        'callsign': track.get('callsign') or icao24,
+                        'latitude': point[1],
+                        'longitude': point[2],
+                        'altitude': point[3]
+                    }
+                    for icao24, track in tracks.items() if icao24 in selected_tracks
+                    for point in track.get('path', [])
+                ])
+                if waypoints.empty:
+                    st.info("No tracks available for the selected flights.")
+                else:
+                    st.write(f"Showing {waypoints['icao24'].nunique()} of {len(selected_tracks)} tracks")
+                    fig_tracks = lazy_import('plotly.express').line_mapbox(
+                        waypoints,
+                        lat='latitude',
+                        lon='longitude',
+                        color='callsign',
+                        hover_data=['altitude'],
+                        center=dict(lat=region.center[0], lon=region.center[1]),
+                        zoom=5,
+                        mapbox_style="open-street-map"
+                    )
+                    st.plotly_chart(fig_tracks, use_container_width=True)
+            
+            # Export options; files are written in chunks by the export module
+            export_col1, export_col2 = st.columns(2)
+            with export_col1:
+                export_format = st.selectbox("Export Format", FORMATS)
+            with export_col2:
+                history_hours = st.number_input("History (hours, 0 = current results only)",
+                                                min_value=0, max_value=24 * 30, value=0)
+            if history_hours:
+                st.caption(f"History exports are limited to {EXPORT_DASHBOARD_MAX_ROWS:,} rows in the selected "
+                           "region with the altitude, velocity and country filters; "
+                           "use `python src/export.py` for full extracts.")
+            if st.button("📥 Export Results"):
+                extension = EXTENSIONS[export_format]
+                try:
+                    with tempfile.TemporaryDirectory() as export_dir:
+                        export_path = f"{export_dir}/flight_data.{extension}"
+                        if history_hours:
+                            # Stored flights for the period in this region and filters, streamed from the database
+                            rows = export_table('flights', export_path, export_format,
+                                                since=time.time() - history_hours * 3600,
+                                                bounds=region.bounds, min_altitude=min_altitude,
+                                                min_velocity=min_velocity, country=country_filter,
+                                                limit=EXPORT_DASHBOARD_MAX_ROWS)
+                        else:
+                            rows = export_frame(filtered_df, export_path, export_format)
+                        with open(export_path, 'rb') as f:
+                            data = f.read()
+                    st.download_button(
+                        label=f"Download {export_format.upper()} ({rows} rows)",
+                        data=data,
+                        file_name=f"flight_data.{extension}",
+                        mime="text/csv" if export_format == 'csv' else "application/octet-stream"
+                    )
+                except Exception as e:
+                    st.error(f"Export failed: {e}")
         
         st.markdown("</div>", unsafe_allow_html=True)
     
     with tab3:
         if 'df' in locals():
-            display_advanced_analytics(df)
+            display_advanced_analytics(df, density_grid.frame(), region.center, occupancy, region.name)
         else:
             st.error("No flight data available for analysis. Please wait for data to load.")
     
@@ -615,10 +955,11 @@ def main():
     </div>
     """, unsafe_allow_html=True)
     
-    # Auto refresh
-    if auto_refresh:
+    # Auto refresh; the live map updates itself, so only rerun without the live server
+    if auto_refresh and not streaming:
         time.sleep(refresh_interval if 'refresh_interval' in locals() else REFRESH_INTERVAL)
         st.experimental_rerun()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    with profile("render page"):
+        main() 
\ No newline at end of file
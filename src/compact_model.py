@@ -0,0 +1,325 @@
+import hashlib
+import json
+import os
+import time
+import numpy as np
+
+# Files making up a compact model artifact (one .npy per array so they can be memory-mapped)
+ARRAY_FILES = {
+    'features': 'features.npy',
+    'thresholds': 'thresholds.npy',
+    'left': 'left.npy',
+    'right': 'right.npy',
+    'leaf_values': 'leaf_values.npy',
+    'roots': 'roots.npy',
+    'scaler_mean': 'scaler_mean.npy',
+    'scaler_scale': 'scaler_scale.npy'
+}
+META_FILE = 'meta.json'
+
+# Bitmask scoring keeps one mask word of reachable leaves per tree, so it needs trees of at
+# most 64 leaves and per-feature tables (split nodes x trees) within a memory budget
+MASK_WORDS = [(8, np.uint8), (16, np.uint16), (32, np.uint32), (64, np.uint64)]
+MAX_MASK_TABLE_BYTES = 64 * 1024 * 1024
+
+def source_fingerprint(paths):
+    """SHA-256 of each source file (model and scaler pickles), keyed by file name."""
+    fingerprint = {}
+    for path in paths:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        fingerprint[os.path.basename(str(path))] = digest.hexdigest()
+    return fingerprint
+
+def export_compact_model(model, scaler, feature_columns, output_dir, source=None):
+    """
+    Flatten a trained random forest and its scaler into contiguous NumPy arrays.
+    source is the fingerprint of the pickles the arrays were exported from.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    features, thresholds, left, right, leaf_values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        is_leaf = tree.children_left == -1
+        local_ids = np.arange(n_nodes)
+
+        # Leaves point to themselves so traversal can run a fixed number of steps
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(np.where(is_leaf, 0.0, tree.threshold).astype(np.float64))
+        left.append((np.where(is_leaf, local_ids, tree.children_left) + offset).astype(np.int32))
+        right.append((np.where(is_leaf, local_ids, tree.children_right) + offset).astype(np.int32))
+
+        # Per-node probability of the delayed class (column 1, as in predict_proba)
+        counts = tree.value[:, 0, :]
+        totals = counts.sum(axis=1)
+        totals[totals == 0] = 1.0
+        if counts.shape[1] > 1:
+            leaf_values.append((counts[:, 1] / totals).astype(np.float64))
+        else:
+            leaf_values.append(np.zeros(n_nodes, dtype=np.float64))
+
+        roots.append(offset)
+        max_depth = max(max_depth, tree.max_depth)
+        offset += n_nodes
+
+    arrays = {
+        'features': np.concatenate(features),
+        'thresholds': np.concatenate(thresholds),
+        'left': np.concatenate(left),
+        'right': np.concatenate(right),
+        'leaf_values': np.concatenate(leaf_values),
+        'roots': np.asarray(roots, dtype=np.int32),
+        'scaler_mean': np.asarray(scaler.mean_, dtype=np.float64),
+        'scaler_scale': np.asarray(scaler.scale_, dtype=np.float64)
+    }
+    for name, filename in ARRAY_FILES.items():
+        np.save(os.path.join(output_dir, filename), np.ascontiguousarray(arrays[name]))
+
+    # Metadata is written last so a partially written export is never picked up
+    meta = {
+        'n_trees': len(roots),
+        'n_nodes': int(offset),
+        'max_depth': int(max_depth),
+        'feature_columns': list(feature_columns),
+        'source': source or {}
+    }
+    with open(os.path.join(output_dir, META_FILE), 'w') as f:
+        json.dump(meta, f)
+
+    print(f"Exported compact model ({meta['n_trees']} trees, {meta['n_nodes']} nodes) to {output_dir}")
+    return output_dir
+
+def compact_model_exists(model_dir):
+    """Check whether a complete compact model artifact exists."""
+    if not os.path.exists(os.path.join(model_dir, META_FILE)):
+        return False
+    return all(os.path.exists(os.path.join(model_dir, f)) for f in ARRAY_FILES.values())
+
+def compact_model_matches(model_dir, source_paths):
+    """
+    Check whether a compact model was exported from the given pickles as they are now.
+    Without the pickles (compact-only deployment) there is nothing to compare against.
+    """
+    if not all(os.path.exists(path) for path in source_paths):
+        return True
+    with open(os.path.join(model_dir, META_FILE)) as f:
+        meta = json.load(f)
+    return meta.get('source') == source_fingerprint(source_paths)
+
+class CompactForest:
+    def __init__(self, arrays, meta):
+        """Wrap flattened forest arrays for vectorized scoring."""
+        self.features = arrays['features']
+        self.thresholds = arrays['thresholds']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.leaf_values = arrays['leaf_values']
+        self.roots = arrays['roots']
+        self.scaler_mean = arrays['scaler_mean']
+        self.scaler_scale = arrays['scaler_scale']
+        self.max_depth = meta['max_depth']
+        self.feature_columns = meta['feature_columns']
+        self.n_trees = meta['n_trees']
+        self._build_leaf_masks()
+
+    @classmethod
+    def load(cls, model_dir, mmap=True):
+        """Load a compact model, memory-mapping the arrays by default."""
+        with open(os.path.join(model_dir, META_FILE)) as f:
+            meta = json.load(f)
+        mmap_mode = 'r' if mmap else None
+        arrays = {
+            name: np.load(os.path.join(model_dir, filename), mmap_mode=mmap_mode)
+            for name, filename in ARRAY_FILES.items()
+        }
+        return cls(arrays, meta)
+
+    def transform(self, X):
+        """Apply the exported StandardScaler to a feature matrix."""
+        X = np.asarray(X, dtype=np.float64)
+        # Trees compare in float32, matching sklearn's internal conversion
+        return ((X - self.scaler_mean) / self.scaler_scale).astype(np.float32)
+
+    def _build_leaf_masks(self):
+        """
+        Precompute bitmask scoring tables (QuickScorer): leaves are numbered left to right, and a
+        split node that tests false rules out the leaves of its left subtree. For each feature the
+        split nodes are sorted by threshold, so the nodes a row fails on that feature are a prefix,
+        and each table row holds the running AND of their masks per tree. A row's leaf in a tree
+        is then the lowest bit left after ANDing one table row per feature.
+        Leaves the tables unset when trees are too large; scoring then walks the trees instead.
+        """
+        self.mask_tables = None
+        left = np.asarray(self.left)
+        node_ids = np.arange(len(left))
+        is_leaf = left == node_ids
+        leaves_per_tree = np.add.reduceat(is_leaf.astype(np.int64), np.asarray(self.roots, dtype=np.int64))
+        width, dtype = next(((bits, dtype) for bits, dtype in MASK_WORDS if bits >= leaves_per_tree.max()),
+                            (None, None))
+        splits = np.flatnonzero(~is_leaf)
+        table_bytes = (len(splits) + len(self.feature_columns)) * self.n_trees * (width or 0) // 8
+        if width is None or table_bytes > MAX_MASK_TABLE_BYTES:
+            return
+
+        # Rank of the first leaf under every node, in left-to-right order, and leaf values by rank
+        right = np.asarray(self.right)
+        first_leaf = np.zeros(len(left), dtype=np.int64)
+        self.leaf_table = np.zeros((self.n_trees, width), dtype=np.float64)
+        for tree, root in enumerate(np.asarray(self.roots)):
+            rank = 0
+            stack = [root]
+            while stack:
+                node = stack.pop()
+                first_leaf[node] = rank
+                if is_leaf[node]:
+                    self.leaf_table[tree, rank] = self.leaf_values[node]
+                    rank += 1
+                else:
+                    stack.append(right[node])
+                    stack.append(left[node])
+        self.leaf_table = self.leaf_table.ravel()
+        self.tree_offsets = np.arange(self.n_trees, dtype=np.int32) * width - 1
+
+        # Leaves still reachable when a split node tests false: all but its left subtree's
+        def below(bit):
+            return np.where(bit >= 64, np.uint64(2 ** 64 - 1),
+                            (np.uint64(1) << np.minimum(bit, 63).astype(np.uint64)) - np.uint64(1))
+        keep = (~(below(first_leaf[right[splits]]) ^ below(first_leaf[left[splits]]))).astype(dtype)
+        trees = np.searchsorted(np.asarray(self.roots), splits, side='right') - 1
+
+        features = np.asarray(self.features)[splits]
+        thresholds = np.asarray(self.thresholds)[splits]
+        self.mask_tables = []
+        for feature in range(len(self.feature_columns)):
+            selected = np.flatnonzero(features == feature)
+            if len(selected) == 0:
+                continue
+            selected = selected[np.argsort(thresholds[selected], kind='stable')]
+            table = np.full((len(selected) + 1, self.n_trees), np.iinfo(dtype).max, dtype=dtype)
+            table[np.arange(1, len(selected) + 1), trees[selected]] = keep[selected]
+            np.bitwise_and.accumulate(table, axis=0, out=table)
+            self.mask_tables.append((feature, thresholds[selected], table))
+
+    def predict_proba(self, X, batch_size=1024):
+        """Return the delay probability for each row of an unscaled feature matrix."""
+        X_scaled = self.transform(X)
+        n_rows = X_scaled.shape[0]
+        probabilities = np.empty(n_rows, dtype=np.float64)
+        score = self._score_masks if self.mask_tables is not None else self._score_walk
+
+        # Score in batches to bound the (trees x rows) working set
+        for start in range(0, n_rows, batch_size):
+            probabilities[start:start + batch_size] = score(X_scaled[start:start + batch_size])
+
+        return probabilities
+
+    def _score_masks(self, batch):
+        """Mean leaf value of a batch of scaled rows, by bitmask lookups."""
+        masks = None
+        for feature, thresholds, table in self.mask_tables:
+            # Split nodes that send the row right (x > threshold) form a prefix of the sorted list
+            failed = np.take(table, np.searchsorted(thresholds, batch[:, feature], side='left'), axis=0)
+            masks = failed if masks is None else np.bitwise_and(masks, failed, out=masks)
+        if masks is None:
+            masks = np.ones((batch.shape[0], self.n_trees), dtype=np.uint8)
+
+        # The exit leaf is the lowest reachable one. frexp gives the bit position exactly, plus one
+        # (powers of two up to 2**63 are exact in float32), which tree_offsets already subtracts.
+        lowest = np.bitwise_and(masks, np.negative(masks), out=masks)
+        leaves = np.frexp(lowest.astype(np.float32))[1]
+        return np.take(self.leaf_table, leaves + self.tree_offsets).mean(axis=1)
+
+    def _score_walk(self, batch):
+        """Mean leaf value of a batch of scaled rows, walking every tree until each row reaches a leaf."""
+        n_rows = batch.shape[0]
+        nodes = np.repeat(np.asarray(self.roots, dtype=np.int64), n_rows)
+        rows = np.tile(np.arange(n_rows), self.n_trees)
+        totals = np.zeros(n_rows, dtype=np.float64)
+
+        while len(nodes):
+            # Rows that reached a leaf in a tree add its value and drop out of that tree
+            at_leaf = self.left[nodes] == nodes
+            if at_leaf.any():
+                totals += np.bincount(rows[at_leaf], weights=self.leaf_values[nodes[at_leaf]], minlength=n_rows)
+                nodes, rows = nodes[~at_leaf], rows[~at_leaf]
+            go_left = batch[rows, self.features[nodes]] <= self.thresholds[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        return totals / self.n_trees
+
+def _measure(func, repeats=1):
+    """Return (result, best wall time) for a callable."""
+    best = float('inf')
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def _rss_bytes():
+    """Resident set size of this process, including touched memory-mapped pages."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+def benchmark(n_rows=10000, repeats=5):
+    """Compare the joblib pickle against the compact artifact for load time, resident memory and latency."""
+    import joblib
+    from predictor import DelayPredictor
+
+    predictor = DelayPredictor()
+    model_path = str(predictor.model_path)
+    scaler_path = predictor.scaler_path
+    compact_dir = str(predictor.compact_model_dir)
+    del predictor
+
+    # Batch scoring input from synthetic state vectors
+    rng = np.random.default_rng(0)
+    X = np.column_stack([
+        rng.normal(250, 50, n_rows),
+        rng.normal(10000, 2000, n_rows),
+        rng.uniform(0, 1000, n_rows),
+        rng.integers(0, 24, n_rows)
+    ])
+
+    # Resident memory added by loading and then scoring once; memory-mapped pages
+    # only count once scoring has touched them
+    rss_start = _rss_bytes()
+    model, scaler = joblib.load(model_path), joblib.load(scaler_path)
+    rss_pickle_load = _rss_bytes()
+    sklearn_probs = model.predict_proba(scaler.transform(X))[:, 1]
+    rss_pickle_score = _rss_bytes()
+
+    compact = CompactForest.load(compact_dir)
+    rss_compact_load = _rss_bytes()
+    compact_probs = compact.predict_proba(X)
+    rss_compact_score = _rss_bytes()
+
+    _, pickle_load = _measure(lambda: (joblib.load(model_path), joblib.load(scaler_path)), repeats)
+    _, compact_load = _measure(lambda: CompactForest.load(compact_dir), repeats)
+    _, sklearn_score = _measure(lambda: model.predict_proba(scaler.transform(X))[:, 1], repeats)
+    _, compact_score = _measure(lambda: compact.predict_proba(X), repeats)
+
+    print(f"Benchmark on {n_rows} rows (best of {repeats})")
+    print(f"{'':<24}{'joblib pickle':>16}{'compact':>16}")
+    print(f"{'load time (ms)':<24}{pickle_load * 1000:>16.2f}{compact_load * 1000:>16.2f}")
+    print(f"{'RSS after load (KB)':<24}{(rss_pickle_load - rss_start) / 1024:>16.1f}"
+          f"{(rss_compact_load - rss_pickle_score) / 1024:>16.1f}")
+    print(f"{'RSS after score (KB)':<24}{(rss_pickle_score - rss_start) / 1024:>16.1f}"
+          f"{(rss_compact_score - rss_pickle_score) / 1024:>16.1f}")
+    print(f"{'batch score (ms)':<24}{sklearn_score * 1000:>16.2f}{compact_score * 1000:>16.2f}")
+    print(f"Max probability difference: {np.abs(sklearn_probs - compact_probs).max():.2e}")
+
+if __name__ == "__main__":
+    benchmark()
@@ -11,17 +11,29 @@ BASE_DIR = Path(__file__).parent.parent
 DATA_DIR = BASE_DIR / "data"
 MODELS_DIR = BASE_DIR / "models"
 
-# Create directories if they don't exist
-DATA_DIR.mkdir(exist_ok=True)
-MODELS_DIR.mkdir(exist_ok=True)
+def ensure_directories():
+    """Create the data and model directories if they don't exist."""
+    DATA_DIR.mkdir(exist_ok=True)
+    MODELS_DIR.mkdir(exist_ok=True)
 
 # Database
 DATABASE_PATH = DATA_DIR / "flights.db"
 
+# Bundled offline airport dataset used for distance and destination features
+AIRPORTS_PATH = DATA_DIR / "airports.csv"
+
 # OpenSky Network API settings
 OPENSKY_USERNAME = os.getenv("OPENSKY_USERNAME")
 OPENSKY_PASSWORD = os.getenv("OPENSKY_PASSWORD")
 OPENSKY_API_BASE = "https://opensky-network.org/api"
+OPENSKY_REQUESTS_PER_HOUR = int(os.getenv("OPENSKY_REQUESTS_PER_HOUR", "360"))  # shared across regions
+
+# Track retrieval
+TRACK_FETCH_WORKERS = int(os.getenv("TRACK_FETCH_WORKERS", "4"))
+TRACK_CACHE_TTL = int(os.getenv("TRACK_CACHE_TTL", "300"))  # seconds before a stored track is refetched
+TRACK_DRILLDOWN_LIMIT = 200  # most tracks requested at once from the search tab
+TRACK_DRILLDOWN_LIMIT_ANONYMOUS = 3  # anonymous access allows one request every 10 seconds
+TRACK_BUDGET_SHARE = float(os.getenv("TRACK_BUDGET_SHARE", "0.25"))  # share of the hourly budget tracks may use
 
 # Region settings
 REGION_BOUNDS = [
@@ -30,12 +42,46 @@ REGION_BOUNDS = [
     float(os.getenv("MIN_LONGITUDE", "-5.0")), # min longitude
     float(os.getenv("MAX_LONGITUDE", "9.0"))   # max longitude
 ]
+MAX_CUSTOM_REGIONS = int(os.getenv("MAX_CUSTOM_REGIONS", "8"))  # distinct custom boxes kept at once
 
 # Model settings
 MODEL_PATH = MODELS_DIR / "delay_prediction_model.pkl"
+COMPACT_MODEL_DIR = MODELS_DIR / "delay_prediction_model_compact"
 
 # Dashboard settings
 REFRESH_INTERVAL = int(os.getenv("REFRESH_INTERVAL", "60"))  # seconds
 MAP_CENTER = [(REGION_BOUNDS[0] + REGION_BOUNDS[1]) / 2,
              (REGION_BOUNDS[2] + REGION_BOUNDS[3]) / 2]  # Center of the region
-MAP_ZOOM = 6
\ No newline at end of file
+MAP_ZOOM = 6
+
+# Density heatmap grids (cell sizes in degrees, coarse to fine)
+DENSITY_CELL_SIZES = [1.0, 0.5, 0.25, 0.1]
+DENSITY_HISTORY_WINDOW = int(os.getenv("DENSITY_HISTORY_WINDOW", "3600"))  # seconds
+DENSITY_MAX_CELLS = 20000  # finest level rendered is the one that fits this many cells
+
+# Sector occupancy (grid cells in degrees split into flight-level bands, plus optional polygons)
+SECTORS_PATH = DATA_DIR / "sectors.json"  # optional list of named polygon sectors
+SECTOR_CELL_SIZE = float(os.getenv("SECTOR_CELL_SIZE", "1.0"))
+FLIGHT_LEVEL_BANDS = [0, 100, 245, 660]  # band edges in flight levels (hundreds of feet)
+OCCUPANCY_HISTORY_WINDOW = int(os.getenv("OCCUPANCY_HISTORY_WINDOW", "86400"))  # seconds kept in memory
+OCCUPANCY_ROLLUP_INTERVAL = int(os.getenv("OCCUPANCY_ROLLUP_INTERVAL", "300"))  # seconds per stored rollup
+
+# Sharded snapshot processing (process pool); 1 worker disables it
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "1"))
+SHARDED_MIN_ROWS = int(os.getenv("SHARDED_MIN_ROWS", "2000"))  # smaller snapshots are scored in-process
+
+# Streaming anomaly detection
+ANOMALY_MAX_AIRCRAFT = int(os.getenv("ANOMALY_MAX_AIRCRAFT", "50000"))  # aircraft with rolling statistics
+ANOMALY_AIRCRAFT_TTL = int(os.getenv("ANOMALY_AIRCRAFT_TTL", "900"))  # seconds before unseen aircraft are dropped
+
+# Streaming exports (rows read from the database per chunk)
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "50000"))
+EXPORT_DASHBOARD_MAX_ROWS = int(os.getenv("EXPORT_DASHBOARD_MAX_ROWS", "200000"))  # history rows per dashboard download
+
+# Number of compact snapshots kept in memory
+SNAPSHOT_HISTORY_SIZE = int(os.getenv("SNAPSHOT_HISTORY_SIZE", "60"))
+
+# Live update server (server-sent events with per-aircraft position deltas)
+LIVE_SERVER_HOST = os.getenv("LIVE_SERVER_HOST", "127.0.0.1")
+LIVE_SERVER_PORT = int(os.getenv("LIVE_SERVER_PORT", "8765"))
+LIVE_SERVER_URL = os.getenv("LIVE_SERVER_URL", f"http://localhost:{LIVE_SERVER_PORT}")  # as seen by the browser
\ No newline at end of file
@@ -1,13 +1,39 @@
 import sqlite3
+import json
+import time
 from datetime import datetime
 import pandas as pd
-from config import DATABASE_PATH
+from config import DATABASE_PATH, ensure_directories
+
+def _connect():
+    """Open a connection to the flights database."""
+    ensure_directories()
+    return sqlite3.connect(DATABASE_PATH)
+
+def _ensure_column(cursor, table, column, declaration):
+    """Add a column to a table created by an earlier version of the schema."""
+    columns = [row[1] for row in cursor.execute(f'PRAGMA table_info({table})')]
+    if column not in columns:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {declaration}')
 
 def init_db():
     """Initialize the database with required tables."""
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = _connect()
     cursor = conn.cursor()
     
+    # Create snapshots table (one row per OpenSky poll)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            region TEXT,
+            bounds TEXT,
+            fetched_at INTEGER,
+            aircraft INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_snapshots_region ON snapshots (region, fetched_at)')
+    
     # Create flights table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS flights (
@@ -22,9 +48,12 @@ def init_db():
             heading REAL,
             timestamp INTEGER,
             on_ground BOOLEAN,
+            poll_id INTEGER REFERENCES snapshots (id),
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     ''')
+    _ensure_column(cursor, 'flights', 'poll_id', 'INTEGER REFERENCES snapshots (id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_flights_poll_id ON flights (poll_id)')
     
     # Create predictions table
     cursor.execute('''
@@ -32,24 +61,88 @@ def init_db():
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             icao24 TEXT,
             delay_probability REAL,
+            poll_id INTEGER REFERENCES snapshots (id),
             predicted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     ''')
+    _ensure_column(cursor, 'predictions', 'poll_id', 'INTEGER REFERENCES snapshots (id)')
+    # One prediction per aircraft and poll; rows stored before poll IDs existed have NULL poll_id
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_predictions_poll ON predictions (poll_id, icao24)')
+    
+    # Create tracks table (one row per aircraft and flight, path stored as JSON)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tracks (
+            icao24 TEXT NOT NULL,
+            start_time INTEGER NOT NULL,
+            end_time INTEGER,
+            callsign TEXT,
+            path TEXT,
+            fetched_at INTEGER,
+            PRIMARY KEY (icao24, start_time)
+        )
+    ''')
+    
+    # Create alerts table for streaming anomaly detection
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS alerts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            icao24 TEXT,
+            callsign TEXT,
+            alert_type TEXT,
+            value REAL,
+            latitude REAL,
+            longitude REAL,
+            detected_at INTEGER,
+            poll_id INTEGER REFERENCES snapshots (id),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    _ensure_column(cursor, 'alerts', 'poll_id', 'INTEGER REFERENCES snapshots (id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_alerts_detected_at ON alerts (detected_at)')
     
+    # Create sector occupancy rollups table (one row per region, sector and time bucket)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sector_occupancy (
+            region TEXT NOT NULL,
+            sector TEXT NOT NULL,
+            bucket_start INTEGER NOT NULL,
+            polls INTEGER,
+            mean_count REAL,
+            max_count INTEGER,
+            entries INTEGER,
+            exits INTEGER,
+            PRIMARY KEY (region, bucket_start, sector)
+        )
+    ''')
+    
+    conn.commit()
+    conn.close()
+
+def create_snapshot(region_name, bounds, aircraft, fetched_at=None):
+    """Record a new OpenSky poll and return its poll ID."""
+    conn = _connect()
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO snapshots (region, bounds, fetched_at, aircraft)
+        VALUES (?, ?, ?, ?)
+    ''', (region_name, json.dumps(list(bounds)), int(fetched_at or time.time()), aircraft))
     conn.commit()
+    poll_id = cursor.lastrowid
     conn.close()
+    return poll_id
 
-def store_flight_data(flight_data):
-    """Store flight data in the database."""
-    conn = sqlite3.connect(DATABASE_PATH)
+def store_flight_data(flight_data, poll_id=None):
+    """Store flight data in the database, tagged with the poll it came from."""
+    conn = _connect()
     df = pd.DataFrame(flight_data)
+    df['poll_id'] = poll_id
     df.to_sql('flights', conn, if_exists='append', index=False)
     conn.close()
     return True
 
 def get_recent_flights(limit=100):
     """Retrieve recent flights from the database."""
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = _connect()
     query = '''
         SELECT * FROM flights 
         ORDER BY timestamp DESC 
@@ -59,9 +152,28 @@ def get_recent_flights(limit=100):
     conn.close()
     return df
 
+def iter_query(query, params=(), chunksize=50000):
+    """
+    Run a query and yield the result as DataFrames of at most chunksize rows,
+    so large results never have to fit in memory at once.
+    """
+    conn = _connect()
+    try:
+        yield from pd.read_sql_query(query, conn, params=params, chunksize=chunksize)
+    finally:
+        conn.close()
+
+def table_columns(table):
+    """(name, declared type) of a table's columns, in table order."""
+    conn = _connect()
+    try:
+        return [(row[1], row[2]) for row in conn.execute(f"PRAGMA table_info({table})")]
+    finally:
+        conn.close()
+
 def store_prediction(flight_data, delay_probability):
     """Store delay prediction for a flight."""
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = _connect()
     cursor = conn.cursor()
     cursor.execute('''
         INSERT INTO predictions (icao24, delay_probability)
@@ -69,4 +181,167 @@ def store_prediction(flight_data, delay_probability):
     ''', (flight_data.get('icao24'), delay_probability))
     conn.commit()
     conn.close()
-    return True 
\ No newline at end of file
+    return True 
+
+def store_predictions(poll_id, flights_df):
+    """Store the delay predictions of a scored snapshot; aircraft already stored for the poll are skipped."""
+    rows = list(zip(
+        flights_df['icao24'].tolist(),
+        flights_df['delay_probability'].astype(float).tolist(),
+        [poll_id] * len(flights_df)
+    ))
+    conn = _connect()
+    conn.executemany('''
+        INSERT OR IGNORE INTO predictions (icao24, delay_probability, poll_id)
+        VALUES (?, ?, ?)
+    ''', rows)
+    conn.commit()
+    conn.close()
+    return True
+
+def get_snapshots(limit=100, region_name=None):
+    """List the most recent polls, optionally for one region."""
+    conn = _connect()
+    query = 'SELECT id AS poll_id, region, bounds, fetched_at, aircraft FROM snapshots'
+    params = ()
+    if region_name is not None:
+        query += ' WHERE region = ?'
+        params = (region_name,)
+    df = pd.read_sql_query(query + ' ORDER BY id DESC LIMIT ?', conn, params=(*params, limit))
+    conn.close()
+    return df
+
+def load_snapshot(poll_id):
+    """Load the flights of one poll with their delay predictions, using the poll_id indexes."""
+    conn = _connect()
+    df = pd.read_sql_query('''
+        SELECT f.icao24, f.callsign, f.origin_country, f.longitude, f.latitude, f.altitude,
+               f.velocity, f.heading, f.timestamp, f.on_ground, f.poll_id, p.delay_probability
+        FROM flights f
+        LEFT JOIN predictions p ON p.poll_id = f.poll_id AND p.icao24 = f.icao24
+        WHERE f.poll_id = ?
+    ''', conn, params=(poll_id,))
+    conn.close()
+    return df
+
+def diff_snapshots(old_poll_id, new_poll_id):
+    """
+    Compare two polls aircraft by aircraft.
+    Returns one row per icao24 with _old/_new columns and a status of
+    'added', 'removed', 'changed' or 'unchanged'.
+    """
+    old = load_snapshot(old_poll_id).drop(columns='poll_id')
+    new = load_snapshot(new_poll_id).drop(columns='poll_id')
+    diff = old.merge(new, on='icao24', how='outer', suffixes=('_old', '_new'), indicator=True)
+
+    compared = ['latitude', 'longitude', 'altitude', 'velocity', 'heading', 'on_ground', 'delay_probability']
+    changed = pd.Series(False, index=diff.index)
+    for col in compared:
+        before, after = diff[f'{col}_old'], diff[f'{col}_new']
+        changed |= (before != after) & ~(before.isna() & after.isna())
+
+    statuses = {'left_only': 'removed', 'right_only': 'added', 'both': 'unchanged'}
+    diff.insert(1, 'status', diff['_merge'].map(statuses).astype(object))
+    diff.loc[(diff['_merge'] == 'both') & changed, 'status'] = 'changed'
+    return diff.drop(columns='_merge')
+
+def store_tracks(tracks):
+    """Store OpenSky tracks, replacing earlier copies of the same flight."""
+    fetched_at = int(time.time())
+    rows = [
+        (track['icao24'], track.get('startTime') or 0, track.get('endTime'),
+         (track.get('callsign') or '').strip() or None, json.dumps(track.get('path', [])), fetched_at)
+        for track in tracks
+    ]
+    conn = _connect()
+    conn.executemany('''
+        INSERT OR REPLACE INTO tracks (icao24, start_time, end_time, callsign, path, fetched_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+    conn.close()
+    return True
+
+def get_cached_tracks(icao24_list, max_age=None):
+    """
+    Return the latest stored track per aircraft as a dict of icao24 -> track.
+    Tracks fetched more than max_age seconds ago are ignored.
+    """
+    tracks = {}
+    if not icao24_list:
+        return tracks
+    min_fetched_at = int(time.time() - max_age) if max_age is not None else 0
+    
+    conn = _connect()
+    # Query in chunks to stay under SQLite's bound parameter limit
+    for start in range(0, len(icao24_list), 500):
+        chunk = icao24_list[start:start + 500]
+        placeholders = ','.join('?' * len(chunk))
+        rows = conn.execute(f'''
+            SELECT icao24, start_time, end_time, callsign, path
+            FROM tracks
+            WHERE icao24 IN ({placeholders}) AND fetched_at >= ?
+            ORDER BY start_time
+        ''', (*chunk, min_fetched_at)).fetchall()
+        # Rows are ordered by start_time, so the latest flight per aircraft wins
+        for icao24, start_time, end_time, callsign, path in rows:
+            tracks[icao24] = {
+                'icao24': icao24,
+                'startTime': start_time,
+                'endTime': end_time,
+                'callsign': callsign,
+                'path': json.loads(path)
+            }
+    conn.close()
+    return tracks
+
+def store_alerts(alerts, poll_id=None):
+    """Store anomaly alerts raised by a poll."""
+    if not alerts:
+        return True
+    conn = _connect()
+    conn.executemany('''
+        INSERT INTO alerts (icao24, callsign, alert_type, value, latitude, longitude, detected_at, poll_id)
+        VALUES (:icao24, :callsign, :alert_type, :value, :latitude, :longitude, :detected_at, :poll_id)
+    ''', [dict(alert, poll_id=poll_id) for alert in alerts])
+    conn.commit()
+    conn.close()
+    return True
+
+def get_recent_alerts(limit=100):
+    """Retrieve the most recent anomaly alerts."""
+    conn = _connect()
+    df = pd.read_sql_query('''
+        SELECT icao24, callsign, alert_type, value, latitude, longitude, detected_at
+        FROM alerts
+        ORDER BY detected_at DESC
+        LIMIT ?
+    ''', conn, params=(limit,))
+    conn.close()
+    return df
+
+def store_sector_occupancy(region_name, rollups):
+    """Store sector occupancy rollups for a region."""
+    if not rollups:
+        return True
+    conn = _connect()
+    conn.executemany('''
+        INSERT OR REPLACE INTO sector_occupancy
+            (region, sector, bucket_start, polls, mean_count, max_count, entries, exits)
+        VALUES (:region, :sector, :bucket_start, :polls, :mean_count, :max_count, :entries, :exits)
+    ''', [dict(rollup, region=region_name) for rollup in rollups])
+    conn.commit()
+    conn.close()
+    return True
+
+def get_sector_occupancy(region_name, since):
+    """Retrieve a region's sector occupancy rollups from bucket_start >= since."""
+    conn = _connect()
+    df = pd.read_sql_query('''
+        SELECT sector, bucket_start, polls, mean_count, max_count, entries, exits
+        FROM sector_occupancy
+        WHERE region = ? AND bucket_start >= ?
+        ORDER BY bucket_start
+    ''', conn, params=(region_name, int(since)))
+    conn.close()
+    return df
\ No newline at end of file
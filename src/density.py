@@ -0,0 +1,134 @@
+import time
+from collections import deque
+import numpy as np
+import pandas as pd
+from config import DENSITY_CELL_SIZES, DENSITY_HISTORY_WINDOW, DENSITY_MAX_CELLS
+
+class DensityGrid:
+    def __init__(self, bounds, cell_sizes=DENSITY_CELL_SIZES, history_window=DENSITY_HISTORY_WINDOW,
+                 max_cells=DENSITY_MAX_CELLS):
+        """
+        Multi-resolution flight density grids over a region.
+        Each level bins positions into cells of a given size in degrees. Levels with more
+        than max_cells cells are never rendered, so they are not kept or binned at all.
+        """
+        self.bounds = [float(b) for b in bounds]
+        self.history_window = history_window
+        self.max_cells = max_cells
+        self.cell_sizes = [size for size in sorted(cell_sizes, reverse=True)  # coarse to fine
+                           if self._n_cells(size) <= max_cells]
+        if not self.cell_sizes:
+            # Even the coarsest level is too fine for this box (e.g. worldwide): use one level that fits
+            size = np.sqrt((self.bounds[1] - self.bounds[0]) * (self.bounds[3] - self.bounds[2]) / max_cells)
+            size = float(np.ceil(size * 100) / 100)
+            while self._n_cells(size) > max_cells:
+                size = round(size + 0.01, 2)
+            self.cell_sizes = [size]
+        self.shapes = {size: self._shape(size) for size in self.cell_sizes}
+
+        # Dense grids for the latest snapshot and running totals over the history window
+        self.current = {size: self._empty(size) for size in self.cell_sizes}
+        self.totals = {size: self._empty(size) for size in self.cell_sizes}
+        self.total_snapshots = 0
+
+        # Per-snapshot sparse contributions, kept to subtract them once they expire
+        self.history = deque()
+        self.last_timestamp = None
+
+    def _shape(self, size):
+        """(rows, columns) of a level's grid."""
+        n_lat = max(int(np.ceil((self.bounds[1] - self.bounds[0]) / size)), 1)
+        n_lon = max(int(np.ceil((self.bounds[3] - self.bounds[2]) / size)), 1)
+        return n_lat, n_lon
+
+    def _n_cells(self, size):
+        """Number of cells of a level."""
+        n_lat, n_lon = self._shape(size)
+        return n_lat * n_lon
+
+    def _empty(self, size):
+        """Zeroed (counts, delay sums) arrays for a level."""
+        n_cells = self.shapes[size][0] * self.shapes[size][1]
+        return np.zeros(n_cells, dtype=np.int64), np.zeros(n_cells, dtype=np.float64)
+
+    def _bin(self, lat, lon, delay, size):
+        """Histogram positions and delay probabilities into one level's flat cell array."""
+        n_lat, n_lon = self.shapes[size]
+        rows = np.clip(((lat - self.bounds[0]) / size).astype(np.int64), 0, n_lat - 1)
+        cols = np.clip(((lon - self.bounds[2]) / size).astype(np.int64), 0, n_lon - 1)
+        cells = rows * n_lon + cols
+        counts = np.bincount(cells, minlength=n_lat * n_lon)
+        sums = np.bincount(cells, weights=delay, minlength=n_lat * n_lon)
+        return counts, sums
+
+    def update(self, flights_df, timestamp=None):
+        """Bin a new snapshot into every level and roll the history window forward."""
+        if timestamp is None:
+            timestamp = time.time()
+        lat = flights_df['latitude'].to_numpy(dtype=np.float64)
+        lon = flights_df['longitude'].to_numpy(dtype=np.float64)
+        if 'delay_probability' in flights_df:
+            delay = flights_df['delay_probability'].to_numpy(dtype=np.float64)
+        else:
+            delay = np.zeros(len(flights_df))
+
+        # Only positions inside the region contribute
+        inside = ((lat >= self.bounds[0]) & (lat <= self.bounds[1]) &
+                  (lon >= self.bounds[2]) & (lon <= self.bounds[3]))
+        lat, lon, delay = lat[inside], lon[inside], delay[inside]
+
+        contribution = {}
+        for size in self.cell_sizes:
+            counts, sums = self._bin(lat, lon, delay, size)
+            self.current[size] = (counts, sums)
+            total_counts, total_sums = self.totals[size]
+            total_counts += counts
+            total_sums += sums
+            nonzero = np.flatnonzero(counts)
+            contribution[size] = (nonzero, counts[nonzero], sums[nonzero])
+
+        self.history.append((timestamp, contribution))
+        self.total_snapshots += 1
+        self.last_timestamp = timestamp
+        self._expire(timestamp)
+
+    def _expire(self, now):
+        """Subtract snapshots that fell out of the history window."""
+        while self.history and now - self.history[0][0] > self.history_window:
+            _, contribution = self.history.popleft()
+            for size, (cells, counts, sums) in contribution.items():
+                self.totals[size][0][cells] -= counts
+                self.totals[size][1][cells] -= sums
+            self.total_snapshots -= 1
+
+    def select_level(self, max_cells=None):
+        """Finest kept cell size whose grid stays within max_cells."""
+        max_cells = max_cells or self.max_cells
+        for size in reversed(self.cell_sizes):
+            if self.shapes[size][0] * self.shapes[size][1] <= max_cells:
+                return size
+        return self.cell_sizes[0]
+
+    def frame(self, size=None, window='current'):
+        """
+        Non-empty cells of one level as a DataFrame with cell centers, count, mean delay
+        and summed delay probability. window is 'current' for the latest snapshot or
+        'history' for the rolling window, where values are averaged per snapshot.
+        """
+        size = size or self.select_level()
+        counts, sums = self.current[size] if window == 'current' else self.totals[size]
+        cells = np.flatnonzero(counts)
+        n_lon = self.shapes[size][1]
+        rows, cols = np.divmod(cells, n_lon)
+
+        cell_counts = counts[cells].astype(np.float64)
+        if window != 'current' and self.total_snapshots:
+            cell_counts = cell_counts / self.total_snapshots
+
+        return pd.DataFrame({
+            'latitude': self.bounds[0] + (rows + 0.5) * size,
+            'longitude': self.bounds[2] + (cols + 0.5) * size,
+            'count': cell_counts,
+            'mean_delay': sums[cells] / counts[cells],
+            'delay_sum': sums[cells] * (cell_counts / counts[cells])
+        })
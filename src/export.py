@@ -0,0 +1,189 @@
+import argparse
+import sys
+from datetime import datetime
+from database import iter_query, table_columns
+from config import EXPORT_CHUNK_SIZE
+
+FORMATS = ['csv', 'ndjson', 'parquet']
+EXTENSIONS = {'csv': 'csv', 'ndjson': 'ndjson', 'parquet': 'parquet'}
+
+# Exportable tables and the unix-seconds expression used for --since/--until
+EXPORT_TABLES = {
+    'snapshots': 'fetched_at',
+    'flights': 'timestamp',
+    'predictions': "CAST(strftime('%s', predicted_at) AS INTEGER)",
+    'tracks': 'fetched_at',
+    'alerts': 'detected_at'
+}
+
+# Tables with positions (for bounds) and with the dashboard's flight filters
+POSITION_TABLES = {'flights', 'alerts'}
+FLIGHT_FILTER_TABLES = {'flights'}
+
+# Parquet column types for SQLite declared types; anything else is exported as text
+SQLITE_TYPES = {'INTEGER': 'int64', 'REAL': 'float64', 'BOOLEAN': 'bool'}
+
+def table_query(table, since=None, until=None, bounds=None, min_altitude=None, min_velocity=None,
+                country=None, limit=None):
+    """
+    SQL and parameters selecting a table's rows within [since, until) in insertion order,
+    optionally inside bounds [min_lat, max_lat, min_lon, max_lon], matching the dashboard's
+    flight filters and capped at limit rows.
+    """
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Unknown table '{table}', expected one of {', '.join(EXPORT_TABLES)}")
+    if bounds is not None and table not in POSITION_TABLES:
+        raise ValueError(f"Table '{table}' has no positions to filter by bounds")
+    if (min_altitude or min_velocity or country) and table not in FLIGHT_FILTER_TABLES:
+        raise ValueError(f"Table '{table}' does not support flight filters")
+    time_column = EXPORT_TABLES[table]
+    conditions, params = [], []
+    if since is not None:
+        conditions.append(f"{time_column} >= ?")
+        params.append(int(since))
+    if until is not None:
+        conditions.append(f"{time_column} < ?")
+        params.append(int(until))
+    if bounds is not None:
+        conditions.append("latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?")
+        params.extend(float(b) for b in bounds)
+    if min_altitude:
+        conditions.append("altitude >= ?")
+        params.append(min_altitude)
+    if min_velocity:
+        conditions.append("velocity >= ?")
+        params.append(min_velocity)
+    if country:
+        # LIKE is case-insensitive, as the dashboard's country search is
+        conditions.append("origin_country LIKE ?")
+        params.append(f"%{country}%")
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    # rowid order follows insertion, so no sort (and no buffering) is needed
+    query = f"SELECT * FROM {table}{where} ORDER BY rowid"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(int(limit))
+    return query, params
+
+def table_schema(table):
+    """(column, parquet type) pairs from a table's declared SQLite column types."""
+    return [(name, SQLITE_TYPES.get(declared.split(' ')[0].upper(), 'string'))
+            for name, declared in table_columns(table)]
+
+def frame_schema(df):
+    """(column, parquet type) pairs from a DataFrame's dtypes."""
+    kinds = {'i': 'int64', 'u': 'int64', 'f': 'float64', 'b': 'bool', 'M': 'timestamp'}
+    return [(name, kinds.get(dtype.kind, 'string')) for name, dtype in df.dtypes.items()]
+
+def frame_chunks(df, chunksize=EXPORT_CHUNK_SIZE):
+    """Split an in-memory DataFrame into chunks for the same writers."""
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+def _write_csv(chunks, path, schema=None):
+    rows = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        for chunk in chunks:
+            chunk.to_csv(f, index=False, header=rows == 0)
+            rows += len(chunk)
+    return rows
+
+def _write_ndjson(chunks, path, schema=None):
+    rows = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            text = chunk.to_json(orient='records', lines=True, date_format='iso')
+            f.write(text if text.endswith('\n') else text + '\n')
+            rows += len(chunk)
+    return rows
+
+def _write_parquet(chunks, path, schema=None):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet export requires pyarrow: pip install pyarrow")
+
+    arrow_types = {'int64': pa.int64(), 'float64': pa.float64(), 'bool': pa.bool_(),
+                   'timestamp': pa.timestamp('ns'), 'string': pa.string()}
+    if schema is not None:
+        # A declared schema keeps all-NULL chunks (e.g. legacy NULL poll_id) from inferring a null type
+        schema = pa.schema([(name, arrow_types[kind]) for name, kind in schema])
+
+    rows = 0
+    writer = None
+    try:
+        for chunk in chunks:
+            if schema is None:
+                schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+            table = pa.Table.from_pandas(chunk, preserve_index=False).cast(schema)
+            if writer is None:
+                writer = pq.ParquetWriter(path, schema)
+            writer.write_table(table)
+            rows += len(chunk)
+        if writer is None:
+            if schema is None:
+                raise ValueError("Cannot write an empty Parquet file without a schema")
+            # No rows: still write a file with the columns
+            writer = pq.ParquetWriter(path, schema)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+WRITERS = {'csv': _write_csv, 'ndjson': _write_ndjson, 'parquet': _write_parquet}
+
+def write_chunks(chunks, path, fmt, schema=None):
+    """
+    Write an iterable of DataFrame chunks to path in the given format.
+    Only one chunk is held in memory at a time. schema is a list of (column, type)
+    pairs used by typed formats. Returns the number of rows written.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown format '{fmt}', expected one of {', '.join(FORMATS)}")
+    return WRITERS[fmt](chunks, path, schema)
+
+def export_table(table, path, fmt='csv', since=None, until=None, chunksize=EXPORT_CHUNK_SIZE, **filters):
+    """
+    Stream a database table (optionally a time range of it) to a file.
+    filters are passed to table_query (bounds, min_altitude, min_velocity, country, limit).
+    """
+    query, params = table_query(table, since, until, **filters)
+    return write_chunks(iter_query(query, params, chunksize), path, fmt, table_schema(table))
+
+def export_frame(df, path, fmt='csv', chunksize=EXPORT_CHUNK_SIZE):
+    """Write an in-memory snapshot to a file with the same writers."""
+    return write_chunks(frame_chunks(df, chunksize), path, fmt, frame_schema(df))
+
+def _parse_time(value):
+    """Accept unix seconds or an ISO date/datetime (local time)."""
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return int(datetime.fromisoformat(value).timestamp())
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid time '{value}', use unix seconds or YYYY-MM-DD[THH:MM:SS]")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk export of stored flight history.")
+    parser.add_argument("table", choices=list(EXPORT_TABLES))
+    parser.add_argument("--format", choices=FORMATS, default='csv', dest='fmt')
+    parser.add_argument("--since", type=_parse_time, help="start time (unix seconds or ISO date), inclusive")
+    parser.add_argument("--until", type=_parse_time, help="end time (unix seconds or ISO date), exclusive")
+    parser.add_argument("--out", help="output file (default: <table>.<format>)")
+    parser.add_argument("--chunksize", type=int, default=EXPORT_CHUNK_SIZE, help="rows read per chunk")
+    args = parser.parse_args(argv)
+
+    out = args.out or f"{args.table}.{EXTENSIONS[args.fmt]}"
+    try:
+        rows = export_table(args.table, out, args.fmt, args.since, args.until, args.chunksize)
+    except (ImportError, ValueError) as e:
+        parser.exit(1, f"{e}\n")
+    print(f"Exported {rows} rows from {args.table} to {out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
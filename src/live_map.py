@@ -0,0 +1,71 @@
+import json
+from urllib.parse import quote
+
+# Leaflet map that applies streamed per-aircraft deltas client-side
+LIVE_MAP_TEMPLATE = """
+<link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css"/>
+<script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
+<div id="live-map" style="width: 100%; height: __HEIGHT__px; border-radius: 10px;"></div>
+<div id="live-status" style="font-family: Arial, sans-serif; font-size: 0.8rem; color: #666;"></div>
+<script>
+    const map = L.map('live-map').setView(__CENTER__, __ZOOM__);
+    L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
+        attribution: '&copy; OpenStreetMap contributors'
+    }).addTo(map);
+    const markers = {};
+    const status = document.getElementById('live-status');
+
+    function popup(icao24, a) {
+        return `<b>${a.callsign || icao24}</b><br>Altitude: ${a.altitude}m<br>` +
+               `Velocity: ${a.velocity}m/s<br>Delay Prob: ${Math.round(a.delay_probability * 100)}%`;
+    }
+
+    function upsert(icao24, a) {
+        const color = a.delay_probability > 0.5 ? 'red' : 'blue';
+        let marker = markers[icao24];
+        if (!marker) {
+            marker = L.circleMarker([a.latitude, a.longitude], {
+                radius: 6, color: color, fill: true, fillOpacity: 0.7, weight: 2
+            }).addTo(map);
+            markers[icao24] = marker;
+        } else {
+            marker.setLatLng([a.latitude, a.longitude]);
+            marker.setStyle({color: color});
+        }
+        marker.bindPopup(popup(icao24, a));
+    }
+
+    function remove(icao24) {
+        if (markers[icao24]) {
+            map.removeLayer(markers[icao24]);
+            delete markers[icao24];
+        }
+    }
+
+    const source = new EventSource(__STREAM_URL__);
+    source.addEventListener('snapshot', (event) => {
+        const aircraft = JSON.parse(event.data);
+        Object.keys(markers).forEach((icao24) => { if (!(icao24 in aircraft)) remove(icao24); });
+        Object.entries(aircraft).forEach(([icao24, a]) => upsert(icao24, a));
+        status.textContent = `Live: ${Object.keys(markers).length} aircraft`;
+    });
+    source.addEventListener('delta', (event) => {
+        const delta = JSON.parse(event.data);
+        Object.entries(delta.upserts).forEach(([icao24, a]) => upsert(icao24, a));
+        delta.removed.forEach(remove);
+        status.textContent = `Live: ${Object.keys(markers).length} aircraft ` +
+            `(${Object.keys(delta.upserts).length} updated, ${delta.removed.length} removed) ` +
+            `at ${new Date().toLocaleTimeString()}`;
+    });
+    source.onerror = () => { status.textContent = 'Live updates disconnected, retrying...'; };
+</script>
+"""
+
+def render_live_map(server_url, region_name, center, zoom, height=600):
+    """Build the HTML for a map that streams position deltas for a region."""
+    stream_url = f"{server_url}/stream?region={quote(region_name)}"
+    return (LIVE_MAP_TEMPLATE
+            .replace('__HEIGHT__', str(height))
+            .replace('__CENTER__', json.dumps(list(center)))
+            .replace('__ZOOM__', str(zoom))
+            .replace('__STREAM_URL__', json.dumps(stream_url)))
@@ -0,0 +1,226 @@
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from config import LIVE_SERVER_HOST, LIVE_SERVER_PORT
+
+# Fields streamed per aircraft and the precision they are rounded to before diffing
+STREAM_FIELDS = {
+    'latitude': 5,
+    'longitude': 5,
+    'altitude': 0,
+    'velocity': 0,
+    'heading': 0,
+    'delay_probability': 2
+}
+HISTORY_SIZE = 50         # deltas kept for reconnecting clients
+KEEPALIVE_INTERVAL = 15   # seconds between SSE keep-alive comments
+
+class DeltaBroadcaster:
+    def __init__(self, history_size=HISTORY_SIZE):
+        """Hold the latest per-aircraft positions for one region and the recent deltas."""
+        self.version = 0
+        self.aircraft = {}
+        self.history = deque(maxlen=history_size)
+        self._condition = threading.Condition()
+
+    @staticmethod
+    def _records(flights_df):
+        """Convert a snapshot DataFrame into compact per-aircraft records keyed by icao24."""
+        columns = {
+            c: flights_df[c].astype(float).fillna(0).round(digits).tolist()
+            for c, digits in STREAM_FIELDS.items() if c in flights_df
+        }
+        callsigns = flights_df['callsign'].tolist() if 'callsign' in flights_df else [None] * len(flights_df)
+
+        records = {}
+        for i, icao24 in enumerate(flights_df['icao24'].tolist()):
+            record = {c: values[i] for c, values in columns.items()}
+            record['callsign'] = callsigns[i] if isinstance(callsigns[i], str) else None
+            records[icao24] = record
+        return records
+
+    def publish(self, flights_df):
+        """Diff a new snapshot against the current one and notify streaming clients."""
+        records = self._records(flights_df) if not flights_df.empty else {}
+
+        with self._condition:
+            # Diff against the current state under the lock so concurrent publishes stay consistent
+            upserts = {
+                icao24: record for icao24, record in records.items()
+                if self.aircraft.get(icao24) != record
+            }
+            removed = [icao24 for icao24 in self.aircraft if icao24 not in records]
+            self.aircraft = records
+            self.version += 1
+            self.history.append({'version': self.version, 'upserts': upserts, 'removed': removed})
+            self._condition.notify_all()
+        return len(upserts), len(removed)
+
+    def snapshot(self):
+        """Full state for clients that connect or fall too far behind."""
+        with self._condition:
+            return {'version': self.version, 'aircraft': dict(self.aircraft)}
+
+    def deltas_since(self, version):
+        """Deltas after a version, or None when the client needs a full snapshot."""
+        with self._condition:
+            if version == self.version:
+                return []
+            if not self.history or self.history[0]['version'] > version + 1 or version > self.version:
+                return None
+            return [d for d in self.history if d['version'] > version]
+
+    def wait(self, version, timeout):
+        """Block until a version newer than the given one is published or timeout expires."""
+        with self._condition:
+            self._condition.wait_for(lambda: self.version > version, timeout)
+            return self.version
+
+class LiveUpdateHub:
+    def __init__(self, scheduler, build_frame, poll_tick=1.0, on_publish=None):
+        """
+        Poll the regions that have live viewers and broadcast their position deltas.
+        build_frame turns a list of state vectors into a scored DataFrame;
+        on_publish is called with (region_name, snapshot, flights_df) for each new snapshot.
+        """
+        self.scheduler = scheduler
+        self.build_frame = build_frame
+        self.on_publish = on_publish
+        self.poll_tick = poll_tick
+        self.broadcasters = {}
+        self.subscribers = {}
+        self._published_at = {}
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()  # publishes come from the poller and script threads
+        self.server = None
+
+    def broadcaster(self, region_name):
+        """Return the broadcaster for a region, creating it on first use."""
+        with self._lock:
+            if region_name not in self.broadcasters:
+                self.broadcasters[region_name] = DeltaBroadcaster()
+            return self.broadcasters[region_name]
+
+    def subscribe(self, region_name):
+        """Register a streaming client for a region."""
+        with self._lock:
+            self.subscribers[region_name] = self.subscribers.get(region_name, 0) + 1
+
+    def unsubscribe(self, region_name):
+        """Unregister a streaming client for a region."""
+        with self._lock:
+            self.subscribers[region_name] = max(self.subscribers.get(region_name, 1) - 1, 0)
+
+    def publish_snapshot(self, region_name, snapshot, flights_df=None):
+        """Broadcast a region snapshot unless it was already published; returns True if it was new."""
+        if snapshot is None:
+            return False
+        # The dedup check, the publish and the callback run as one step, so a snapshot
+        # is published (and on_publish fires) exactly once
+        with self._publish_lock:
+            if self._published_at.get(region_name) == snapshot.fetched_at:
+                return False
+            if flights_df is None:
+                flights_df = self.build_frame(snapshot.flights)
+            self.broadcaster(region_name).publish(flights_df)
+            self._published_at[region_name] = snapshot.fetched_at
+            if self.on_publish:
+                self.on_publish(region_name, snapshot, flights_df)
+            return True
+
+    def _poll_loop(self):
+        """Refresh watched regions as they become due and publish what changed."""
+        while True:
+            with self._lock:
+                watched = [name for name, count in self.subscribers.items() if count > 0]
+            for region_name in watched:
+                try:
+                    self.publish_snapshot(region_name, self.scheduler.get_snapshot(region_name))
+                except Exception as e:
+                    print(f"Error publishing live update for {region_name}: {e}")
+            time.sleep(self.poll_tick)
+
+    def start(self, host=LIVE_SERVER_HOST, port=LIVE_SERVER_PORT):
+        """Start the HTTP/SSE server and the poller on daemon threads."""
+        if self.server is not None:
+            return self.server
+
+        # Bind this hub to a handler class for the server
+        handler = type('Handler', (LiveUpdateHandler,), {'hub': self})
+        try:
+            self.server = ThreadingHTTPServer((host, port), handler)
+        except OSError as e:
+            print(f"Could not start live update server on {host}:{port}: {e}")
+            return None
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        threading.Thread(target=self._poll_loop, daemon=True).start()
+        print(f"Live update server listening on http://{host}:{port}")
+        return self.server
+
+class LiveUpdateHandler(BaseHTTPRequestHandler):
+    hub = None
+
+    def log_message(self, format, *args):
+        """Silence per-request logging."""
+        pass
+
+    def _send_headers(self, content_type):
+        """Send response headers allowing the dashboard iframe to connect."""
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+
+    def _send_event(self, event, payload, version):
+        """Write one server-sent event."""
+        data = json.dumps(payload, separators=(',', ':'))
+        self.wfile.write(f"id: {version}\nevent: {event}\ndata: {data}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+    def do_GET(self):
+        """Serve /snapshot as JSON and /stream as server-sent events."""
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        region_name = query.get('region', [''])[0]
+        if not region_name or region_name not in self.hub.scheduler.regions:
+            self.send_error(404, "Unknown region")
+            return
+
+        broadcaster = self.hub.broadcaster(region_name)
+        if url.path == '/snapshot':
+            self._send_headers('application/json')
+            self.wfile.write(json.dumps(broadcaster.snapshot()).encode('utf-8'))
+        elif url.path == '/stream':
+            self._stream(region_name, broadcaster)
+        else:
+            self.send_error(404)
+
+    def _stream(self, region_name, broadcaster):
+        """Send a full snapshot once, then only per-aircraft deltas."""
+        self._send_headers('text/event-stream')
+        self.hub.subscribe(region_name)
+        try:
+            last_id = self.headers.get('Last-Event-ID')
+            version = int(last_id) if last_id and last_id.isdigit() else -1
+            while True:
+                deltas = broadcaster.deltas_since(version) if version >= 0 else None
+                if deltas is None:
+                    snapshot = broadcaster.snapshot()
+                    version = snapshot['version']
+                    self._send_event('snapshot', snapshot['aircraft'], version)
+                else:
+                    for delta in deltas:
+                        version = delta['version']
+                        self._send_event('delta', delta, version)
+                if broadcaster.wait(version, KEEPALIVE_INTERVAL) == version:
+                    self.wfile.write(b": keep-alive\n\n")
+                    self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.hub.unsubscribe(region_name)
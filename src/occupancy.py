@@ -0,0 +1,256 @@
+import json
+import os
+import time
+from collections import deque
+import numpy as np
+import pandas as pd
+from config import (
+    SECTORS_PATH, SECTOR_CELL_SIZE, FLIGHT_LEVEL_BANDS,
+    OCCUPANCY_HISTORY_WINDOW, OCCUPANCY_ROLLUP_INTERVAL
+)
+
+FEET_PER_METER = 3.28084
+
+def load_sectors(path=SECTORS_PATH):
+    """
+    Load polygon sectors from a JSON list of
+    {"name": ..., "polygon": [[lat, lon], ...], "lower_fl": ..., "upper_fl": ...}.
+    Returns an empty list when no sector file is configured.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def flight_levels(altitude, on_ground=None):
+    """Flight level (hundreds of feet) for altitudes in meters; aircraft on the ground are FL0."""
+    levels = np.asarray(altitude, dtype=np.float64) * FEET_PER_METER / 100
+    if on_ground is not None:
+        levels = np.where(np.asarray(on_ground, dtype=bool), 0.0, levels)
+    return np.maximum(levels, 0.0)
+
+def points_in_polygon(lat, lon, polygon):
+    """Even-odd ray casting test of many points against one polygon of [lat, lon] vertices."""
+    vertices = np.asarray(polygon, dtype=np.float64)
+    inside = np.zeros(len(lat), dtype=bool)
+
+    # Only points inside the bounding box need the edge tests
+    candidates = np.flatnonzero((lat >= vertices[:, 0].min()) & (lat <= vertices[:, 0].max()) &
+                                (lon >= vertices[:, 1].min()) & (lon <= vertices[:, 1].max()))
+    if len(candidates) == 0:
+        return inside
+    y, x = lat[candidates], lon[candidates]
+    result = np.zeros(len(candidates), dtype=bool)
+
+    y1, x1 = vertices[-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for y2, x2 in vertices:
+            crosses = (y1 > y) != (y2 > y)
+            x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+            result ^= crosses & (x < x_cross)
+            y1, x1 = y2, x2
+    inside[candidates] = result
+    return inside
+
+class SectorOccupancy:
+    def __init__(self, bounds, cell_size=SECTOR_CELL_SIZE, fl_bands=FLIGHT_LEVEL_BANDS, sectors=None,
+                 history_window=OCCUPANCY_HISTORY_WINDOW, rollup_interval=OCCUPANCY_ROLLUP_INTERVAL):
+        """
+        Per-poll aircraft counts, entries and exits for airspace sectors.
+        Sectors are grid cells split into flight-level bands, plus optional polygon sectors.
+        """
+        self.bounds = [float(b) for b in bounds]
+        self.cell_size = cell_size
+        self.fl_bands = list(fl_bands)
+        self.n_bands = len(self.fl_bands) - 1
+        self.n_lat = max(int(np.ceil((self.bounds[1] - self.bounds[0]) / cell_size)), 1)
+        self.n_lon = max(int(np.ceil((self.bounds[3] - self.bounds[2]) / cell_size)), 1)
+        self.n_grid = self.n_lat * self.n_lon * self.n_bands
+        self.polygons = load_sectors() if sectors is None else sectors
+        self.n_sectors = self.n_grid + len(self.polygons)
+        self.history_window = history_window
+        self.rollup_interval = rollup_interval
+        self._names = {}
+
+        # Sector of every aircraft at the previous poll, one array per layer (grid, polygons)
+        self.previous = None
+        self.last_timestamp = None
+
+        # Per-poll sparse (sectors, counts, entries, exits), plus region totals per poll
+        self.history = deque()
+
+        # Dense accumulators for the rollup bucket in progress, and finished rollup rows
+        self.bucket_start = None
+        self._reset_bucket()
+        self.pending_rollups = []
+
+    def sector_name(self, sector):
+        """Readable name of a sector id, e.g. '48,2 FL100-245' or a polygon sector's name."""
+        name = self._names.get(sector)
+        if name is None:
+            if sector >= self.n_grid:
+                name = self.polygons[sector - self.n_grid]['name']
+            else:
+                band, cell = divmod(sector, self.n_lat * self.n_lon)
+                row, col = divmod(cell, self.n_lon)
+                lat = self.bounds[0] + row * self.cell_size
+                lon = self.bounds[2] + col * self.cell_size
+                name = (f"{lat:g},{lon:g} "
+                        f"FL{self.fl_bands[band]:03d}-{self.fl_bands[band + 1]:03d}")
+            self._names[sector] = name
+        return name
+
+    def assign(self, flights_df):
+        """
+        Sector ids of every aircraft as (grid, polygon) arrays; -1 where an aircraft is
+        outside the region or in no polygon sector.
+        """
+        lat = flights_df['latitude'].to_numpy(dtype=np.float64)
+        lon = flights_df['longitude'].to_numpy(dtype=np.float64)
+        on_ground = flights_df['on_ground'] if 'on_ground' in flights_df else None
+        levels = flight_levels(flights_df['altitude'], on_ground)
+
+        # Grid layer: direct index arithmetic on cell and flight-level band
+        inside = ((lat >= self.bounds[0]) & (lat <= self.bounds[1]) &
+                  (lon >= self.bounds[2]) & (lon <= self.bounds[3]))
+        rows = np.clip(((lat - self.bounds[0]) / self.cell_size).astype(np.int64), 0, self.n_lat - 1)
+        cols = np.clip(((lon - self.bounds[2]) / self.cell_size).astype(np.int64), 0, self.n_lon - 1)
+        bands = np.clip(np.searchsorted(self.fl_bands, levels, side='right') - 1, 0, self.n_bands - 1)
+        grid = np.where(inside, (bands * self.n_lat + rows) * self.n_lon + cols, -1)
+
+        # Polygon layer: first matching polygon whose flight-level range contains the aircraft
+        polygon = np.full(len(lat), -1, dtype=np.int64)
+        for i, sector in enumerate(self.polygons):
+            unassigned = polygon < 0
+            in_band = ((levels >= sector.get('lower_fl', 0)) &
+                       (levels < sector.get('upper_fl', float('inf'))))
+            candidates = unassigned & in_band
+            if candidates.any():
+                matches = np.zeros(len(lat), dtype=bool)
+                matches[candidates] = points_in_polygon(lat[candidates], lon[candidates], sector['polygon'])
+                polygon[matches] = self.n_grid + i
+        return grid, polygon
+
+    def update(self, flights_df, timestamp=None):
+        """Assign a new poll to sectors and update counts, entry/exit rates and rollups."""
+        if timestamp is None:
+            timestamp = time.time()
+        flights_df = flights_df.drop_duplicates('icao24')
+        icao24 = pd.Index(flights_df['icao24'])
+        layers = self.assign(flights_df)
+
+        counts = np.zeros(self.n_sectors, dtype=np.int64)
+        for sectors in layers:
+            counts += np.bincount(sectors[sectors >= 0], minlength=self.n_sectors)
+
+        # Entries and exits come from comparing each aircraft's sector with the previous poll.
+        # Aircraft that disappear from the feed count as exits of their last sector.
+        entries = np.zeros(self.n_sectors, dtype=np.int64)
+        exits = np.zeros(self.n_sectors, dtype=np.int64)
+        if self.previous is not None:
+            previous_icao24, previous_layers = self.previous
+            positions = previous_icao24.get_indexer(icao24)   # -1 for new aircraft
+            reverse = icao24.get_indexer(previous_icao24)     # -1 for vanished aircraft
+            seen = positions >= 0
+            still_here = reverse >= 0
+            for sectors, previous_sectors in zip(layers, previous_layers):
+                before = np.where(seen, previous_sectors[np.where(seen, positions, 0)], -1)
+                entered = (sectors >= 0) & (sectors != before)
+                entries += np.bincount(sectors[entered], minlength=self.n_sectors)
+
+                after = np.where(still_here, sectors[np.where(still_here, reverse, 0)], -1)
+                left = (previous_sectors >= 0) & (previous_sectors != after)
+                exits += np.bincount(previous_sectors[left], minlength=self.n_sectors)
+
+        self.previous = (icao24, layers)
+        self.last_timestamp = timestamp
+
+        active = np.flatnonzero(counts | entries | exits)
+        grid_total = int((layers[0] >= 0).sum())
+        self.history.append((timestamp, active, counts[active], entries[active], exits[active], grid_total))
+        while self.history and timestamp - self.history[0][0] > self.history_window:
+            self.history.popleft()
+
+        self._roll(timestamp, counts, entries, exits)
+
+    def _reset_bucket(self):
+        """Zero the rollup accumulators."""
+        self.bucket_polls = 0
+        self.bucket_counts = np.zeros(self.n_sectors, dtype=np.int64)
+        self.bucket_max = np.zeros(self.n_sectors, dtype=np.int64)
+        self.bucket_entries = np.zeros(self.n_sectors, dtype=np.int64)
+        self.bucket_exits = np.zeros(self.n_sectors, dtype=np.int64)
+
+    def _roll(self, timestamp, counts, entries, exits):
+        """Fold a poll into the current rollup bucket, closing it when the interval ends."""
+        bucket_start = int(timestamp // self.rollup_interval * self.rollup_interval)
+        if self.bucket_start is not None and bucket_start != self.bucket_start:
+            self._close_bucket()
+        self.bucket_start = bucket_start
+        self.bucket_polls += 1
+        self.bucket_counts += counts
+        np.maximum(self.bucket_max, counts, out=self.bucket_max)
+        self.bucket_entries += entries
+        self.bucket_exits += exits
+
+    def _close_bucket(self):
+        """Turn the finished bucket into rollup rows for non-empty sectors."""
+        active = np.flatnonzero(self.bucket_counts | self.bucket_entries | self.bucket_exits)
+        for sector in active:
+            self.pending_rollups.append({
+                'sector': self.sector_name(sector),
+                'bucket_start': self.bucket_start,
+                'polls': self.bucket_polls,
+                'mean_count': float(self.bucket_counts[sector] / self.bucket_polls),
+                'max_count': int(self.bucket_max[sector]),
+                'entries': int(self.bucket_entries[sector]),
+                'exits': int(self.bucket_exits[sector])
+            })
+        self._reset_bucket()
+
+    def flush_rollups(self):
+        """Return and clear the rollup rows of buckets finished since the last flush."""
+        rollups, self.pending_rollups = self.pending_rollups, []
+        return rollups
+
+    def current(self):
+        """Sectors of the latest poll with their count, entries and exits, busiest first."""
+        columns = ['sector', 'count', 'entries', 'exits']
+        if not self.history:
+            return pd.DataFrame(columns=columns)
+        _, sectors, counts, entries, exits, _ = self.history[-1]
+        df = pd.DataFrame({
+            'sector': [self.sector_name(s) for s in sectors],
+            'count': counts,
+            'entries': entries,
+            'exits': exits
+        }, columns=columns)
+        return df.sort_values('count', ascending=False, ignore_index=True)
+
+    def totals(self):
+        """Aircraft in the region per poll over the in-memory window."""
+        return pd.DataFrame(
+            [(pd.Timestamp(t, unit='s'), total) for t, _, _, _, _, total in self.history],
+            columns=['time', 'aircraft']
+        )
+
+    def series(self, top=5):
+        """Per-poll count, entries and exits of the busiest sectors (by latest count)."""
+        columns = ['time', 'sector', 'count', 'entries', 'exits']
+        if not self.history:
+            return pd.DataFrame(columns=columns)
+        _, sectors, counts, _, _, _ = self.history[-1]
+        busiest = sectors[np.argsort(counts)[::-1][:top]]
+
+        rows = []
+        for timestamp, sectors, counts, entries, exits, _ in self.history:
+            # Sparse arrays are sorted by sector id
+            positions = np.searchsorted(sectors, busiest)
+            positions = np.minimum(positions, max(len(sectors) - 1, 0))
+            for sector, position in zip(busiest, positions):
+                present = len(sectors) > 0 and sectors[position] == sector
+                rows.append((pd.Timestamp(timestamp, unit='s'), self.sector_name(sector),
+                             counts[position] if present else 0,
+                             entries[position] if present else 0,
+                             exits[position] if present else 0))
+        return pd.DataFrame(rows, columns=columns)
@@ -1,12 +1,47 @@
 import requests
 from datetime import datetime
 import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from config import (
     OPENSKY_API_BASE,
     OPENSKY_USERNAME,
     OPENSKY_PASSWORD,
-    REGION_BOUNDS
+    OPENSKY_REQUESTS_PER_HOUR,
+    REGION_BOUNDS,
+    TRACK_FETCH_WORKERS,
+    TRACK_CACHE_TTL,
+    TRACK_DRILLDOWN_LIMIT,
+    TRACK_DRILLDOWN_LIMIT_ANONYMOUS,
+    TRACK_BUDGET_SHARE
 )
+from database import get_cached_tracks, store_tracks
+
+class RequestBudget:
+    def __init__(self, requests_per_hour=OPENSKY_REQUESTS_PER_HOUR):
+        """Sliding one-hour request budget shared by everything using one client."""
+        self.requests_per_hour = requests_per_hour
+        self._request_times = deque()
+        self._lock = threading.Lock()
+    
+    def try_acquire(self):
+        """Reserve one request if the budget allows it."""
+        with self._lock:
+            now = time.time()
+            while self._request_times and now - self._request_times[0] >= 3600:
+                self._request_times.popleft()
+            if len(self._request_times) >= self.requests_per_hour:
+                return False
+            self._request_times.append(now)
+            return True
+
+    def release(self):
+        """Give back a reservation that was not used."""
+        with self._lock:
+            if self._request_times:
+                # Dropping the newest reservation restores the count
+                self._request_times.pop()
 
 class OpenSkyClient:
     def __init__(self):
@@ -20,37 +55,59 @@ class OpenSkyClient:
         
         self.base_url = OPENSKY_API_BASE
         self.session = requests.Session()
+        self.budget = RequestBudget()
+        # Track requests also count against the shared budget, but are capped to a share of it
+        # so drill-downs cannot starve region polling
+        self.track_budget = RequestBudget(int(OPENSKY_REQUESTS_PER_HOUR * TRACK_BUDGET_SHARE))
+        self.track_drilldown_limit = TRACK_DRILLDOWN_LIMIT if self.auth else TRACK_DRILLDOWN_LIMIT_ANONYMOUS
         self.last_request_time = 0
         self.min_request_interval = 10  # seconds between requests for anonymous users
+        self._rate_lock = threading.Lock()
+        self._local = threading.local()
     
     def _wait_for_rate_limit(self):
         """Ensure we don't exceed the rate limit."""
-        if not self.auth:  # Only for anonymous users
-            elapsed = time.time() - self.last_request_time
-            if elapsed < self.min_request_interval:
-                sleep_time = self.min_request_interval - elapsed
-                print(f"Rate limiting: waiting {sleep_time:.1f} seconds...")
-                time.sleep(sleep_time)
-        self.last_request_time = time.time()
+        # Reserve the next request slot under the lock, then sleep without holding it
+        with self._rate_lock:
+            now = time.time()
+            if self.auth:
+                slot = now
+            else:  # Only for anonymous users
+                slot = max(now, self.last_request_time + self.min_request_interval)
+            self.last_request_time = slot
+        if slot > now:
+            print(f"Rate limiting: waiting {slot - now:.1f} seconds...")
+            time.sleep(slot - now)
     
-    def get_states(self):
+    def _get_session(self):
+        """Return a requests session for the current thread (sessions are not thread-safe)."""
+        if threading.current_thread() is threading.main_thread():
+            return self.session
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+    
+    def get_states(self, bounds=None):
         """
         Fetch current state vectors for the specified region.
-        Returns a list of flights with their current states.
+        Bounds are [min_lat, max_lat, min_lon, max_lon] and default to REGION_BOUNDS.
+        Returns a list of flights with their current states (empty when the region has no
+        traffic), or None when the request failed so callers can keep their previous data.
         """
         self._wait_for_rate_limit()
+        bounds = bounds or REGION_BOUNDS
         
         endpoint = f"{self.base_url}/states/all"
         params = {
-            "lamin": REGION_BOUNDS[0],  # min latitude
-            "lamax": REGION_BOUNDS[1],  # max latitude
-            "lomin": REGION_BOUNDS[2],  # min longitude
-            "lomax": REGION_BOUNDS[3]   # max longitude
+            "lamin": bounds[0],  # min latitude
+            "lamax": bounds[1],  # max latitude
+            "lomin": bounds[2],  # min longitude
+            "lomax": bounds[3]   # max longitude
         }
         
         try:
             print("Fetching flight data from OpenSky Network...")
-            response = self.session.get(
+            response = self._get_session().get(
                 endpoint,
                 params=params,
                 auth=self.auth,
@@ -59,12 +116,12 @@ class OpenSkyClient:
             
             if response.status_code == 429:  # Too Many Requests
                 print("Rate limit exceeded. Please wait before trying again.")
-                return []
+                return None
             
             response.raise_for_status()
             data = response.json()
             
-            if not data or "states" not in data:
+            if not data or not data.get("states"):
                 print("No flight data available in the specified region")
                 return []
             
@@ -93,10 +150,10 @@ class OpenSkyClient:
             print(f"Error fetching data from OpenSky Network: {e}")
             if hasattr(e.response, 'status_code'):
                 print(f"Status code: {e.response.status_code}")
-            return []
+            return None
         except Exception as e:
             print(f"Unexpected error: {e}")
-            return []
+            return None
     
     def get_flight_details(self, icao24):
         """
@@ -108,7 +165,7 @@ class OpenSkyClient:
         params = {"icao24": icao24}
         
         try:
-            response = self.session.get(
+            response = self._get_session().get(
                 endpoint,
                 params=params,
                 auth=self.auth,
@@ -118,4 +175,39 @@ class OpenSkyClient:
             return response.json()
         except requests.exceptions.RequestException as e:
             print(f"Error fetching flight details: {e}")
-            return None
\ No newline at end of file
+            return None
+    
+    def get_tracks(self, icao24_list, max_workers=TRACK_FETCH_WORKERS, max_age=TRACK_CACHE_TTL):
+        """
+        Fetch tracks for many aircraft.
+        Tracks fetched within max_age seconds are served from the local tracks table;
+        the rest are fetched by a bounded worker pool under the shared request budget.
+        Returns a dict of icao24 -> track.
+        """
+        icao24_list = list(dict.fromkeys(i for i in icao24_list if i))
+        tracks = get_cached_tracks(icao24_list, max_age=max_age)
+        missing = [icao24 for icao24 in icao24_list if icao24 not in tracks]
+        if not missing:
+            return tracks
+        
+        def fetch(icao24):
+            if not self.track_budget.try_acquire():
+                return None
+            if not self.budget.try_acquire():
+                # The track slot was not used, so it stays available for later drill-downs
+                self.track_budget.release()
+                return None
+            return self.get_flight_details(icao24)
+        
+        # Anonymous requests are spaced out anyway, so extra workers would only wait
+        max_workers = max_workers if self.auth else 1
+        print(f"Fetching {len(missing)} tracks ({len(tracks)} served from cache)...")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            fetched = [track for track in executor.map(fetch, missing) if track and track.get('path')]
+        
+        if len(fetched) < len(missing):
+            print(f"{len(missing) - len(fetched)} tracks unavailable or over the request budget")
+        if fetched:
+            store_tracks(fetched)
+            tracks.update({track['icao24']: track for track in fetched})
+        return tracks
\ No newline at end of file
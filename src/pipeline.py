@@ -0,0 +1,187 @@
+import os
+import time
+import zlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from airports import get_airport_index
+from snapshot import compact_snapshot
+from config import PIPELINE_WORKERS, SHARDED_MIN_ROWS
+
+# Columns exchanged with shard workers through shared memory (all stored as float64)
+INPUT_COLUMNS = ['latitude', 'longitude', 'heading', 'altitude', 'velocity', 'on_ground', 'timestamp']
+OUTPUT_COLUMNS = ['nearest_idx', 'nearest_airport_km', 'dest_idx', 'distance_to_dest', 'phase_code',
+                  'delay_probability']
+
+def build_snapshot_frame(flights, predictor, pipeline=None):
+    """
+    Turn a list of state vectors into the scored DataFrame shown on the dashboard.
+    Large snapshots are scored by the sharded pipeline when one is given.
+    """
+    df = pd.DataFrame(flights)
+    if df.empty:
+        return df
+
+    if pipeline is not None and len(df) >= SHARDED_MIN_ROWS:
+        df = pipeline.process(df)
+    else:
+        # Nearest airport, likely destination and phase for the whole snapshot
+        df = df.join(get_airport_index().annotate(df))
+
+        # Get delay predictions for the whole snapshot in one call
+        df['delay_probability'] = predictor.predict_batch(df)
+
+    # Categorical countries, interned callsigns and float32 kinematics
+    return compact_snapshot(df)
+
+# Per-process state of shard workers, loaded once by the pool initializer
+_worker_predictor = None
+
+def _init_worker():
+    """Load the (memory-mapped) model and airport index in a worker process."""
+    global _worker_predictor
+    from predictor import DelayPredictor
+    _worker_predictor = DelayPredictor()
+    get_airport_index()
+
+def _attach(name, n_rows, n_cols):
+    """Attach to a shared memory block and view it as a (rows, cols) float64 array."""
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray((n_rows, n_cols), dtype=np.float64, buffer=block.buf)
+
+def _score_shard(input_name, output_name, n_rows, start, end):
+    """Compute airport features and delay probabilities for rows [start, end) in place."""
+    input_block, inputs = _attach(input_name, n_rows, len(INPUT_COLUMNS))
+    output_block, outputs = _attach(output_name, n_rows, len(OUTPUT_COLUMNS))
+    try:
+        # Each worker reads only its own slice of the shared block
+        shard = {col: inputs[start:end, i].copy() for i, col in enumerate(INPUT_COLUMNS)}
+        nearest_idx, nearest_km, dest_idx, dest_km, phase_code = get_airport_index().features(
+            shard['latitude'], shard['longitude'], shard['heading'], shard['altitude'], shard['on_ground'] > 0)
+
+        features = pd.DataFrame({
+            'velocity': shard['velocity'],
+            'altitude': shard['altitude'],
+            'distance_to_dest': dest_km,
+            'timestamp': shard['timestamp']
+        })
+        results = [nearest_idx, nearest_km, dest_idx, dest_km, phase_code,
+                   _worker_predictor.predict_batch(features)]
+        for i, values in enumerate(results):
+            outputs[start:end, i] = values
+        return end - start
+    finally:
+        # Views must be released before the blocks can be closed
+        del inputs, outputs
+        input_block.close()
+        output_block.close()
+
+class ShardedPipeline:
+    def __init__(self, workers=PIPELINE_WORKERS):
+        """Process pool that scores snapshot shards partitioned by icao24 hash."""
+        self.workers = max(int(workers), 1)
+        # Spawn rather than fork: the dashboard process runs the live server, the poller and
+        # SQLite writers on other threads, and forking while one of them holds a lock can deadlock
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                            mp_context=multiprocessing.get_context('spawn'))
+
+    def _shards(self, icao24):
+        """Stable icao24-hash shard number for each aircraft."""
+        return np.fromiter((zlib.crc32(i.encode()) % self.workers for i in icao24),
+                           dtype=np.int64, count=len(icao24))
+
+    def process(self, flights_df):
+        """Score a snapshot across the pool, exchanging columns through shared memory."""
+        n_rows = len(flights_df)
+
+        # Group rows by shard so every worker reads and writes one contiguous slice
+        shards = self._shards(flights_df['icao24'].tolist())
+        order = np.argsort(shards, kind='stable')
+        bounds = np.searchsorted(shards[order], np.arange(self.workers + 1))
+
+        input_block = shared_memory.SharedMemory(create=True, size=max(n_rows * len(INPUT_COLUMNS) * 8, 1))
+        output_block = shared_memory.SharedMemory(create=True, size=max(n_rows * len(OUTPUT_COLUMNS) * 8, 1))
+        inputs = outputs = None
+        try:
+            inputs = np.ndarray((n_rows, len(INPUT_COLUMNS)), dtype=np.float64, buffer=input_block.buf)
+            for i, col in enumerate(INPUT_COLUMNS):
+                values = flights_df[col] if col in flights_df else pd.Series(0.0, index=flights_df.index)
+                inputs[:, i] = pd.to_numeric(values, errors='coerce').fillna(0).to_numpy(dtype=np.float64)[order]
+
+            futures = [
+                self.executor.submit(_score_shard, input_block.name, output_block.name, n_rows,
+                                     int(bounds[s]), int(bounds[s + 1]))
+                for s in range(self.workers) if bounds[s + 1] > bounds[s]
+            ]
+            for future in futures:
+                future.result()
+
+            # Copy results out of shared memory, back in the original row order
+            outputs = np.ndarray((n_rows, len(OUTPUT_COLUMNS)), dtype=np.float64, buffer=output_block.buf)
+            results = np.empty_like(outputs)
+            results[order] = outputs
+        finally:
+            # Views must be released before the blocks can be closed
+            inputs = outputs = None
+            input_block.close()
+            input_block.unlink()
+            output_block.close()
+            output_block.unlink()
+
+        columns = dict(zip(OUTPUT_COLUMNS, results.T))
+        features = get_airport_index().to_frame(
+            columns['nearest_idx'].astype(np.int64), columns['nearest_airport_km'],
+            columns['dest_idx'].astype(np.int64), columns['distance_to_dest'],
+            columns['phase_code'].astype(np.int64), flights_df.index)
+        df = flights_df.join(features)
+        df['delay_probability'] = columns['delay_probability']
+        return df
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        self.executor.shutdown(wait=False)
+
+def benchmark(n_rows=20000, repeats=3):
+    """Time snapshot scoring in-process and with increasing numbers of workers."""
+    from predictor import DelayPredictor
+
+    rng = np.random.default_rng(0)
+    flights = [
+        {
+            'icao24': f"{i:06x}",
+            'callsign': f"TST{i % 9999:04d}",
+            'origin_country': 'Test',
+            'longitude': float(rng.uniform(-10, 30)),
+            'latitude': float(rng.uniform(36, 60)),
+            'altitude': float(rng.uniform(0, 12000)),
+            'velocity': float(rng.uniform(50, 280)),
+            'heading': float(rng.uniform(0, 360)),
+            'on_ground': bool(rng.random() < 0.05),
+            'timestamp': int(time.time())
+        }
+        for i in range(n_rows)
+    ]
+    predictor = DelayPredictor()
+
+    def best_time(pipeline):
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            build_snapshot_frame(flights, predictor, pipeline)
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    print(f"Snapshot of {n_rows} aircraft (best of {repeats})")
+    print(f"{'in-process':<14}{best_time(None) * 1000:10.1f} ms")
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        pipeline = ShardedPipeline(workers)
+        pipeline.process(pd.DataFrame(flights[:workers * 10]))  # warm up the pool
+        print(f"{f'{workers} workers':<14}{best_time(pipeline) * 1000:10.1f} ms")
+        pipeline.shutdown()
+        workers *= 2
+
+if __name__ == "__main__":
+    benchmark()
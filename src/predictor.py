@@ -1,29 +1,43 @@
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import StandardScaler
-import joblib
 from datetime import datetime
 import os
-from config import MODEL_PATH
+from config import MODEL_PATH, COMPACT_MODEL_DIR
+from compact_model import (
+    CompactForest, export_compact_model, compact_model_exists, compact_model_matches, source_fingerprint
+)
+
+# Destination distances the model is trained on. The bundled airport list is sparse outside
+# France and the US, so distances elsewhere can be thousands of km; they are clipped to this range.
+MAX_DISTANCE_TO_DEST_KM = 1000.0
 
 class DelayPredictor:
     def __init__(self):
         """Initialize the delay predictor."""
         self.model = None
         self.scaler = None
+        self.compact_model = None
         self.feature_columns = ['velocity', 'altitude', 'distance_to_dest', 'hour_of_day']
         self.model_path = MODEL_PATH
         self.scaler_path = str(MODEL_PATH).replace('.pkl', '_scaler.pkl')
+        self.compact_model_dir = COMPACT_MODEL_DIR
         self.load_or_train_model()
     
     def load_or_train_model(self):
         """Load existing model or train a new one if none exists."""
         try:
-            if os.path.exists(self.model_path) and os.path.exists(self.scaler_path):
+            # The compact artifact is only used while it matches the pickles it was exported from
+            source_paths = [self.model_path, self.scaler_path]
+            if (compact_model_exists(self.compact_model_dir) and
+                    compact_model_matches(self.compact_model_dir, source_paths)):
+                print("Loading compact model...")
+                self.compact_model = CompactForest.load(self.compact_model_dir)
+            elif os.path.exists(self.model_path) and os.path.exists(self.scaler_path):
                 print("Loading existing model and scaler...")
+                import joblib
                 self.model = joblib.load(self.model_path)
                 self.scaler = joblib.load(self.scaler_path)
+                self._export_compact_model()
             else:
                 print("No existing model found. Training new model...")
                 self._train_initial_model()
@@ -37,6 +51,8 @@ class DelayPredictor:
     def _save_model(self):
         """Save the trained model and scaler."""
         try:
+            import joblib
+            
             # Create directory if it doesn't exist
             os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
             
@@ -49,12 +65,27 @@ class DelayPredictor:
             print("Model and scaler saved successfully.")
         except Exception as e:
             print(f"Error saving model: {e}")
+        
+        self._export_compact_model()
+    
+    def _export_compact_model(self):
+        """Export the forest and scaler as memory-mappable arrays for fast inference."""
+        try:
+            source = source_fingerprint([self.model_path, self.scaler_path])
+            export_compact_model(self.model, self.scaler, self.feature_columns, self.compact_model_dir, source)
+            self.compact_model = CompactForest.load(self.compact_model_dir)
+        except Exception as e:
+            print(f"Error exporting compact model: {e}")
     
     def _train_initial_model(self):
         """Train an initial model with synthetic data."""
         print("Training new model with synthetic data...")
         
         try:
+            # scikit-learn is only needed for training, not for compact inference
+            from sklearn.ensemble import RandomForestClassifier
+            from sklearn.preprocessing import StandardScaler
+            
             # Generate synthetic training data
             np.random.seed(42)
             n_samples = 1000
@@ -63,7 +94,7 @@ class DelayPredictor:
             X = pd.DataFrame({
                 'velocity': np.random.normal(250, 50, n_samples),
                 'altitude': np.random.normal(10000, 2000, n_samples),
-                'distance_to_dest': np.random.uniform(0, 1000, n_samples),
+                'distance_to_dest': np.random.uniform(0, MAX_DISTANCE_TO_DEST_KM, n_samples),
                 'hour_of_day': np.random.randint(0, 24, n_samples)
             })
             
@@ -88,33 +119,51 @@ class DelayPredictor:
             print(f"Error training model: {e}")
             raise
     
-    def predict_delay(self, flight_data):
-        """Predict delay probability for a flight."""
+    def _feature_matrix(self, flights_df):
+        """Build the model feature matrix for a DataFrame of flights."""
+        n_rows = len(flights_df)
+        
+        def column(name):
+            if name in flights_df:
+                return pd.to_numeric(flights_df[name], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+            return np.zeros(n_rows)
+        
+        # A snapshot shares a handful of timestamps, so convert each distinct one only once
+        timestamps, inverse = np.unique(column('timestamp').astype(np.int64), return_inverse=True)
+        hours = np.array([datetime.fromtimestamp(ts).hour for ts in timestamps], dtype=np.float64)
+        
+        features = {
+            'velocity': column('velocity'),
+            'altitude': column('altitude'),
+            'distance_to_dest': np.minimum(column('distance_to_dest'), MAX_DISTANCE_TO_DEST_KM),
+            'hour_of_day': hours[inverse] if n_rows else np.zeros(0)
+        }
+        return np.column_stack([features[col] for col in self.feature_columns])
+    
+    def predict_batch(self, flights_df):
+        """Predict delay probabilities for every flight in a DataFrame."""
         try:
-            if self.model is None or self.scaler is None:
+            if self.compact_model is None and (self.model is None or self.scaler is None):
                 print("Model or scaler not initialized. Retraining...")
                 self._train_initial_model()
                 self._save_model()
             
-            # Create a DataFrame with all required features
-            features = pd.DataFrame({
-                'velocity': [float(flight_data.get('velocity', 0))],
-                'altitude': [float(flight_data.get('altitude', 0))],
-                'distance_to_dest': [0.0],  # Placeholder
-                'hour_of_day': [float(datetime.fromtimestamp(flight_data.get('timestamp', 0)).hour)]
-            })
-            
-            # Ensure all feature columns are present and in correct order
-            for col in self.feature_columns:
-                if col not in features.columns:
-                    features[col] = 0.0
-            
-            # Scale features using only the specified columns in the correct order
-            X_scaled = self.scaler.transform(features[self.feature_columns])
-            
-            # Get prediction probability
-            delay_prob = self.model.predict_proba(X_scaled)[0][1]
+            # Forests too large for bitmask scoring are walked node by node, which is slower
+            # than sklearn when the sklearn model happens to be loaded anyway
+            if self.compact_model is None or (self.model is not None and self.compact_model.mask_tables is None):
+                X_scaled = self.scaler.transform(self._feature_matrix(flights_df))
+                return self.model.predict_proba(X_scaled)[:, 1]
             
+            return self.compact_model.predict_proba(self._feature_matrix(flights_df))
+        
+        except Exception as e:
+            print(f"Error in batch prediction: {e}")
+            return np.zeros(len(flights_df))
+    
+    def predict_delay(self, flight_data):
+        """Predict delay probability for a flight."""
+        try:
+            delay_prob = self.predict_batch(pd.DataFrame([dict(flight_data)]))[0]
             return float(delay_prob)
             
         except Exception as e:
@@ -0,0 +1,31 @@
+import importlib
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# Enable with ATM_PROFILE_STARTUP=1 (or `python run_app.py --profile`)
+PROFILE_STARTUP = os.getenv("ATM_PROFILE_STARTUP") == "1"
+PROCESS_START = time.perf_counter()
+
+@contextmanager
+def profile(component):
+    """Print how long a block took when startup profiling is enabled."""
+    if not PROFILE_STARTUP:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        since_start = (time.perf_counter() - PROCESS_START) * 1000
+        print(f"[profile] {component:<32} {elapsed:9.1f} ms  (t+{since_start:.0f} ms)")
+
+def lazy_import(module_name):
+    """Import a module on first use, timing the import when profiling."""
+    module = sys.modules.get(module_name)
+    if module is None:
+        with profile(f"import {module_name}"):
+            module = importlib.import_module(module_name)
+    return module
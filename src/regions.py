@@ -0,0 +1,189 @@
+import threading
+import time
+from config import REGION_BOUNDS, REFRESH_INTERVAL, MAX_CUSTOM_REGIONS
+
+CUSTOM_PREFIX = "Custom:"
+FAILED_FETCH_RETRY = 30  # seconds before a region whose request failed is retried
+
+def custom_region_name(bounds):
+    """Registry name of a custom box, so each distinct box is its own region."""
+    return CUSTOM_PREFIX + ",".join(f"{float(b):g}" for b in bounds)
+
+class Region:
+    def __init__(self, name, bounds, refresh_interval=REFRESH_INTERVAL, priority=0):
+        """A named bounding box [min_lat, max_lat, min_lon, max_lon] with its own refresh policy."""
+        self.name = name
+        self.bounds = [float(b) for b in bounds]
+        self.refresh_interval = refresh_interval
+        self.priority = priority
+        self.last_requested = 0.0
+
+    @property
+    def center(self):
+        """Center of the region as [lat, lon]."""
+        return [(self.bounds[0] + self.bounds[1]) / 2,
+                (self.bounds[2] + self.bounds[3]) / 2]
+
+    @property
+    def area(self):
+        """Size of the bounding box in square degrees."""
+        return (self.bounds[1] - self.bounds[0]) * (self.bounds[3] - self.bounds[2])
+
+    def contains(self, other):
+        """Check whether this region's box fully covers another region's box."""
+        return (self.bounds[0] <= other.bounds[0] and self.bounds[1] >= other.bounds[1] and
+                self.bounds[2] <= other.bounds[2] and self.bounds[3] >= other.bounds[3])
+
+    def contains_point(self, latitude, longitude):
+        """Check whether a position lies inside the region."""
+        return (self.bounds[0] <= latitude <= self.bounds[1] and
+                self.bounds[2] <= longitude <= self.bounds[3])
+
+# Built-in regions; France follows the bounds configured in .env
+DEFAULT_REGIONS = [
+    Region("France", REGION_BOUNDS, refresh_interval=REFRESH_INTERVAL, priority=10),
+    Region("Europe", [35.0, 72.0, -25.0, 45.0], refresh_interval=120, priority=5),
+    Region("North America", [15.0, 72.0, -170.0, -50.0], refresh_interval=120, priority=5)
+]
+
+class RegionSnapshot:
+    def __init__(self, region_name, flights, fetched_at, source_region, poll_id=None):
+        """Latest flights for a region, where they came from and the stored poll they belong to."""
+        self.region_name = region_name
+        self.flights = flights
+        self.fetched_at = fetched_at
+        self.source_region = source_region
+        self.poll_id = poll_id
+
+    def age(self, now=None):
+        """Seconds since the underlying data was fetched."""
+        return (now or time.time()) - self.fetched_at
+
+class RegionScheduler:
+    def __init__(self, client, regions=None, on_fetch=None):
+        """
+        Multiplex several regions over one OpenSky client and its request budget.
+        on_fetch is called with (region, flights, fetched_at) once per actual OpenSky request;
+        its return value (the stored poll ID) is kept on the snapshot and on snapshots derived from it.
+        """
+        self.client = client
+        self.on_fetch = on_fetch
+        self.regions = {}
+        self.snapshots = {}
+        self.retry_at = {}  # region name -> time before which a failed fetch is not retried
+        self._lock = threading.RLock()
+        for region in (regions if regions is not None else DEFAULT_REGIONS):
+            self.add_region(region)
+
+    def add_region(self, region):
+        """Register or replace a region; replacing it with new bounds discards its old data."""
+        with self._lock:
+            current = self.regions.get(region.name)
+            if current is not None and current.bounds != region.bounds:
+                self._drop_snapshots(region.name)
+            self.regions[region.name] = region
+
+    def remove_region(self, name):
+        """Unregister a region and discard its data."""
+        with self._lock:
+            self.regions.pop(name, None)
+            self.retry_at.pop(name, None)
+            self._drop_snapshots(name)
+
+    def _drop_snapshots(self, name):
+        """Discard a region's snapshot and every snapshot derived from it."""
+        stale = [key for key, snapshot in self.snapshots.items()
+                 if key == name or snapshot.source_region == name]
+        for key in stale:
+            del self.snapshots[key]
+
+    def custom_region(self, bounds, max_custom=MAX_CUSTOM_REGIONS):
+        """
+        Return the shared region for a custom box, registering it on first use.
+        Sessions asking for the same box share it; the least recently requested
+        custom boxes beyond max_custom are removed.
+        """
+        name = custom_region_name(bounds)
+        with self._lock:
+            region = self.regions.get(name)
+            if region is None:
+                region = Region(name, bounds, priority=0)
+                self.add_region(region)
+            region.last_requested = time.time()
+
+            custom = sorted((r for r in self.regions.values() if r.name.startswith(CUSTOM_PREFIX)),
+                            key=lambda r: r.last_requested)
+            for stale in custom[:max(len(custom) - max_custom, 0)]:
+                self.remove_region(stale.name)
+            return region
+
+    def is_due(self, region, now=None):
+        """Check whether a region's snapshot is older than its refresh interval."""
+        if (now or time.time()) < self.retry_at.get(region.name, 0):
+            return False
+        snapshot = self.snapshots.get(region.name)
+        return snapshot is None or snapshot.age(now) >= region.refresh_interval
+
+    def _reuse_snapshot(self, region, now):
+        """Derive a region's snapshot from a fresh snapshot of a covering region."""
+        for snapshot in self.snapshots.values():
+            source = self.regions.get(snapshot.source_region)
+            if source is None or snapshot.source_region != snapshot.region_name:
+                continue  # only reuse data that was fetched directly
+            if source.contains(region) and snapshot.age(now) < region.refresh_interval:
+                flights = [
+                    f for f in snapshot.flights
+                    if region.contains_point(f['latitude'], f['longitude'])
+                ]
+                self.snapshots[region.name] = RegionSnapshot(
+                    region.name, flights, snapshot.fetched_at, snapshot.source_region, snapshot.poll_id)
+                return True
+        return False
+
+    def _fetch(self, region):
+        """Fetch a region from OpenSky if the client's shared budget allows it."""
+        if not self.client.budget.try_acquire():
+            print(f"Request budget exhausted, keeping previous snapshot for {region.name}")
+            return False
+        fetched_at = time.time()
+        flights = self.client.get_states(region.bounds)
+        if flights is None:
+            # Like an exhausted budget, a failed request keeps the previous snapshot
+            print(f"Request failed, keeping previous snapshot for {region.name}")
+            self.retry_at[region.name] = fetched_at + min(FAILED_FETCH_RETRY, region.refresh_interval)
+            return False
+        self.retry_at.pop(region.name, None)
+        poll_id = self.on_fetch(region, flights, fetched_at) if self.on_fetch and flights else None
+        self.snapshots[region.name] = RegionSnapshot(region.name, flights, fetched_at, region.name, poll_id)
+        return True
+
+    def refresh(self, names=None, force=False):
+        """
+        Refresh due regions in priority order.
+        Regions covered by another due region are served from that region's fetch.
+        """
+        with self._lock:
+            now = time.time()
+            candidates = [self.regions[n] for n in (names or self.regions) if n in self.regions]
+            for region in candidates:
+                region.last_requested = now
+            due = [r for r in candidates if force or self.is_due(r, now)]
+            due.sort(key=lambda r: (-r.priority, -r.area))
+
+            for region in due:
+                if not force and not self.is_due(region, now):
+                    continue  # already fetched on behalf of another region
+                if not force and self._reuse_snapshot(region, now):
+                    continue
+                # Fetch a larger due region on this region's behalf when it covers it
+                covering = [r for r in due if r is not region and r.contains(region)]
+                if covering and not force:
+                    container = max(covering, key=lambda r: r.priority)
+                    if self._fetch(container) and self._reuse_snapshot(region, now):
+                        continue
+                self._fetch(region)
+
+    def get_snapshot(self, name, force=False):
+        """Return the current snapshot for a region, refreshing it first if due."""
+        self.refresh([name], force=force)
+        return self.snapshots.get(name)
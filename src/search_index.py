@@ -0,0 +1,83 @@
+from collections import defaultdict
+import numpy as np
+
+NGRAM_SIZE = 3
+
+def normalize(text):
+    """Normalize a callsign or country for matching: uppercase, no surrounding whitespace."""
+    return text.strip().upper() if isinstance(text, str) else ''
+
+class FlightSearchIndex:
+    def __init__(self, flights_df):
+        """
+        Build callsign and country indexes for one snapshot.
+        All lookups return sorted row positions into flights_df.
+        """
+        self.size = len(flights_df)
+        callsigns = [normalize(c) for c in flights_df['callsign']] if 'callsign' in flights_df else [''] * self.size
+        self.callsigns = np.array(callsigns, dtype=str)
+
+        # Sorted callsigns for exact and prefix lookups via binary search
+        self.sorted_order = np.argsort(self.callsigns, kind='stable')
+        self.sorted_callsigns = self.callsigns[self.sorted_order]
+
+        # Trigram postings for substring lookups
+        postings = defaultdict(list)
+        for position, callsign in enumerate(callsigns):
+            for gram in {callsign[i:i + NGRAM_SIZE] for i in range(len(callsign) - NGRAM_SIZE + 1)}:
+                postings[gram].append(position)
+        self.ngrams = {gram: np.array(positions, dtype=np.int64) for gram, positions in postings.items()}
+
+        # Inverted index by country
+        countries = defaultdict(list)
+        if 'origin_country' in flights_df:
+            for position, country in enumerate(flights_df['origin_country']):
+                countries[normalize(country)].append(position)
+        self.countries = {country: np.array(positions, dtype=np.int64) for country, positions in countries.items()}
+
+    def _range(self, lo_key, hi_key):
+        """Sorted positions whose callsign falls in [lo_key, hi_key)."""
+        lo = np.searchsorted(self.sorted_callsigns, lo_key, side='left')
+        hi = np.searchsorted(self.sorted_callsigns, hi_key, side='left')
+        return np.sort(self.sorted_order[lo:hi])
+
+    def exact(self, term):
+        """Positions of flights whose callsign equals term."""
+        term = normalize(term)
+        lo = np.searchsorted(self.sorted_callsigns, term, side='left')
+        hi = np.searchsorted(self.sorted_callsigns, term, side='right')
+        return np.sort(self.sorted_order[lo:hi])
+
+    def prefix(self, term):
+        """Positions of flights whose callsign starts with term."""
+        term = normalize(term)
+        return self._range(term, term + '\uffff')
+
+    def substring(self, term):
+        """Positions of flights whose callsign contains term."""
+        term = normalize(term)
+        if not term:
+            return np.arange(self.size)
+        if len(term) < NGRAM_SIZE:
+            return np.flatnonzero(np.char.find(self.callsigns, term) >= 0)
+
+        # Intersect the postings of every trigram, then verify the candidates
+        candidates = None
+        for i in range(len(term) - NGRAM_SIZE + 1):
+            postings = self.ngrams.get(term[i:i + NGRAM_SIZE])
+            if postings is None:
+                return np.empty(0, dtype=np.int64)
+            candidates = postings if candidates is None else np.intersect1d(candidates, postings, assume_unique=True)
+        return candidates[np.char.find(self.callsigns[candidates], term) >= 0]
+
+    def country(self, term):
+        """Positions of flights whose origin country contains term."""
+        term = normalize(term)
+        matches = [positions for country, positions in self.countries.items() if term in country]
+        if not matches:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(matches))
+
+    def search(self, term):
+        """Positions matching term by callsign substring or country, as in the search box."""
+        return np.union1d(self.substring(term), self.country(term))
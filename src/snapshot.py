@@ -0,0 +1,112 @@
+import sys
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Column storage used by compact snapshots
+FLOAT32_COLUMNS = ['longitude', 'latitude', 'altitude', 'velocity', 'heading',
+                   'nearest_airport_km', 'distance_to_dest', 'delay_probability']
+CATEGORICAL_COLUMNS = ['origin_country', 'nearest_airport', 'likely_destination', 'flight_phase']
+INTERNED_COLUMNS = ['icao24', 'callsign']
+
+def _intern(value):
+    """Intern strings so repeated callsigns share one object across snapshots."""
+    return sys.intern(value) if isinstance(value, str) else None
+
+def compact_snapshot(flights_df):
+    """Return a memory-compact version of a snapshot DataFrame."""
+    columns = {}
+    for col in flights_df.columns:
+        values = flights_df[col]
+        if col in FLOAT32_COLUMNS:
+            columns[col] = values.astype(np.float32)
+        elif col in CATEGORICAL_COLUMNS:
+            columns[col] = values.astype('category')
+        elif col in INTERNED_COLUMNS:
+            columns[col] = pd.Series([_intern(v) for v in values], index=values.index, dtype=object)
+        elif col == 'timestamp':
+            columns[col] = values.astype(np.uint32)  # unix seconds
+        elif col == 'on_ground':
+            columns[col] = values.astype(bool)
+        else:
+            columns[col] = values
+    return pd.DataFrame(columns).reset_index(drop=True)
+
+class AircraftRecord:
+    __slots__ = ('icao24', 'callsign', 'origin_country', 'longitude', 'latitude', 'altitude',
+                 'velocity', 'heading', 'on_ground', 'timestamp', 'likely_destination',
+                 'distance_to_dest', 'delay_probability')
+
+    def __init__(self, **fields):
+        """Fixed-layout record for a single aircraft."""
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_snapshot(cls, flights_df, position):
+        """Read one aircraft out of a snapshot by row position."""
+        return cls(**{
+            name: flights_df[name].iat[position]
+            for name in cls.__slots__ if name in flights_df
+        })
+
+    @classmethod
+    def iter_snapshot(cls, flights_df):
+        """Yield one record per aircraft, reading each column once rather than row by row."""
+        columns = {name: flights_df[name].tolist() for name in cls.__slots__ if name in flights_df}
+        for position in range(len(flights_df)):
+            yield cls(**{name: values[position] for name, values in columns.items()})
+
+    def to_dict(self):
+        """Plain dict view of the record."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+def _column_bytes(values):
+    """Bytes held by a column, counting each shared string object only once."""
+    if values.dtype == object:
+        objects = {id(v): v for v in values if v is not None}
+        return values.to_numpy().nbytes + sum(sys.getsizeof(v) for v in objects.values())
+    return int(values.memory_usage(index=False, deep=True))
+
+def memory_report(flights_df):
+    """Memory used by a snapshot, per column and per aircraft."""
+    by_column = {col: _column_bytes(flights_df[col]) for col in flights_df.columns}
+    total = sum(by_column.values())
+    n_aircraft = len(flights_df)
+    return {
+        'aircraft': n_aircraft,
+        'total_bytes': total,
+        'bytes_per_aircraft': total / n_aircraft if n_aircraft else 0.0,
+        'by_column': by_column
+    }
+
+class SnapshotHistory:
+    def __init__(self, max_snapshots=60):
+        """Keep the most recent compact snapshots in memory, keyed by (region, fetched_at)."""
+        self.max_snapshots = max_snapshots
+        self.snapshots = OrderedDict()
+
+    def add(self, region_name, fetched_at, flights_df):
+        """Store a snapshot, evicting the oldest beyond max_snapshots."""
+        self.snapshots[(region_name, fetched_at)] = flights_df
+        while len(self.snapshots) > self.max_snapshots:
+            self.snapshots.popitem(last=False)
+
+    def get(self, region_name, fetched_at):
+        """The stored snapshot for (region, fetched_at), or None."""
+        return self.snapshots.get((region_name, fetched_at))
+
+    def memory_report(self):
+        """Total memory held by stored snapshots."""
+        total = 0
+        aircraft = 0
+        for flights_df in list(self.snapshots.values()):
+            report = memory_report(flights_df)
+            total += report['total_bytes']
+            aircraft += report['aircraft']
+        return {
+            'snapshots': len(self.snapshots),
+            'aircraft': aircraft,
+            'total_bytes': total,
+            'bytes_per_aircraft': total / aircraft if aircraft else 0.0
+        }
@@ -0,0 +1,16 @@
+import os
+import sys
+import pytest
+
+# Modules under src/ import each other by name, as when run through run_app.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """The database module pointed at a fresh database file."""
+    pytest.importorskip("dotenv")
+    pytest.importorskip("pandas")
+    import database
+    monkeypatch.setattr(database, 'DATABASE_PATH', tmp_path / 'flights.db')
+    database.init_db()
+    return database
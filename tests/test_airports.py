@@ -0,0 +1,44 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("sklearn")
+pytest.importorskip("dotenv")
+
+from airports import AirportIndex, FEATURE_COLUMNS
+
+@pytest.fixture(scope="module")
+def index():
+    return AirportIndex()
+
+def _features(index, lat, lon, heading, altitude, on_ground=False):
+    nearest, nearest_km, dest, dest_km, phase = index.features([lat], [lon], [heading], [altitude], [on_ground])
+    return index.to_frame(nearest, nearest_km, dest, dest_km, phase).iloc[0]
+
+def test_destination_is_the_closest_airport_ahead(index):
+    # East of Paris, flying west towards Charles de Gaulle
+    inbound = _features(index, 49.0, 4.0, 270, 9000)
+    assert inbound['likely_destination'] == 'LFPG'
+    assert inbound['distance_to_dest'] == pytest.approx(106, abs=1)
+
+    # Same position flying east: Paris is behind, so it is not the destination
+    outbound = _features(index, 49.0, 4.0, 90, 9000)
+    assert outbound['nearest_airport'] == 'LFPG'
+    assert outbound['likely_destination'] != 'LFPG'
+
+def test_aircraft_on_the_ground_is_at_the_nearest_airport(index):
+    # At Orly, pointing north towards Charles de Gaulle and Le Bourget
+    parked = _features(index, 48.73, 2.40, 0, 0, on_ground=True)
+    assert parked['likely_destination'] == parked['nearest_airport'] == 'LFPO'
+    assert parked['flight_phase'] == 'ground'
+
+def test_phase_depends_on_altitude_near_an_airport(index):
+    assert _features(index, 48.9, 2.3, 180, 1500)['flight_phase'] == 'terminal'
+    assert _features(index, 48.9, 2.3, 180, 9000)['flight_phase'] == 'en_route'
+    # Low but far from any airport
+    assert _features(index, 46.0, -15.0, 180, 1500)['flight_phase'] == 'en_route'
+
+def test_annotate_empty_snapshot(index):
+    annotated = index.annotate(pd.DataFrame(columns=['latitude', 'longitude']))
+    assert annotated.empty
+    assert list(annotated.columns) == FEATURE_COLUMNS
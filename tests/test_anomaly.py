@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip("dotenv")
+
+from anomaly import AnomalyDetector
+
+def _state(t, altitude=10000.0, velocity=230.0, latitude=48.0, longitude=2.0, on_ground=False):
+    return {'icao24': 'abc123', 'callsign': 'TST1', 'timestamp': t, 'altitude': altitude,
+            'velocity': velocity, 'latitude': latitude, 'longitude': longitude, 'on_ground': on_ground}
+
+def _types(alerts):
+    return [alert['alert_type'] for alert in alerts]
+
+def test_steady_flight_raises_nothing():
+    detector = AnomalyDetector()
+    for i in range(10):
+        assert detector.process([_state(1000 + 60 * i, longitude=2.0 + 0.18 * i)], now=1000 + 60 * i) == []
+
+def test_rapid_descent_is_detected():
+    detector = AnomalyDetector()
+    detector.process([_state(1000)], now=1000)
+    assert 'rapid_descent' in _types(detector.process([_state(1060, altitude=7000.0)], now=1060))
+
+def test_missing_altitude_gap_is_not_a_rapid_descent():
+    detector = AnomalyDetector()
+    t = 1000
+    altitude = 10000.0
+    detector.process([_state(t, altitude)], now=t)
+    # Normal 10 m/s descent, with several polls that carry no altitude (sent as 0)
+    for _ in range(5):
+        t += 10
+        altitude -= 100
+        detector.process([_state(t, altitude=0.0)], now=t)
+    t += 10
+    altitude -= 100
+    assert 'rapid_descent' not in _types(detector.process([_state(t, altitude)], now=t))
+
+def test_position_jump_is_detected():
+    detector = AnomalyDetector()
+    detector.process([_state(1000)], now=1000)
+    alerts = detector.process([_state(1010, latitude=50.0)], now=1010)
+    assert 'position_jump' in _types(alerts)
+
+def test_alerts_are_copied_for_readers():
+    detector = AnomalyDetector()
+    detector.process([_state(1000)], now=1000)
+    detector.process([_state(1060, altitude=7000.0)], now=1060)
+    recent = detector.recent()
+    detector.process([_state(1120, latitude=52.0)], now=1120)
+    assert len(recent) == 1
+
+def test_unseen_aircraft_are_evicted():
+    detector = AnomalyDetector(aircraft_ttl=100)
+    detector.process([_state(1000)], now=1000)
+    detector.process([], now=1200)
+    assert not detector.stats
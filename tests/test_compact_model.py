@@ -0,0 +1,81 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+sklearn = pytest.importorskip("sklearn")
+joblib = pytest.importorskip("joblib")
+
+from compact_model import (
+    CompactForest, export_compact_model, compact_model_exists, compact_model_matches, source_fingerprint
+)
+
+FEATURES = ['velocity', 'altitude', 'distance_to_dest', 'hour_of_day']
+
+def _train(seed=0, n_samples=500, label_noise=0.0):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import StandardScaler
+
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.normal(250, 50, n_samples),
+        rng.normal(10000, 2000, n_samples),
+        rng.uniform(0, 1000, n_samples),
+        rng.integers(0, 24, n_samples)
+    ])
+    y = ((X[:, 0] < 200) | (X[:, 1] < 8000)).astype(int)
+    # Noisy labels grow deep trees with many leaves
+    y ^= (rng.random(n_samples) < label_noise).astype(int)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=20, random_state=seed).fit(scaler.transform(X), y)
+    return model, scaler, X
+
+@pytest.mark.parametrize("mmap,walk,label_noise", [
+    (True, False, 0.0),
+    (False, False, 0.0),
+    (True, True, 0.0),
+    (True, False, 0.05),   # up to 64 leaves: 64-bit masks
+    (True, False, 0.3),
+])
+def test_predict_proba_matches_sklearn(tmp_path, mmap, walk, label_noise):
+    model, scaler, X = _train(label_noise=label_noise)
+    export_compact_model(model, scaler, FEATURES, tmp_path)
+    compact = CompactForest.load(tmp_path, mmap=mmap)
+    if walk:
+        compact.mask_tables = None
+    if label_noise > 0.1:
+        # Trees too large for one mask word are scored by walking them
+        assert compact.mask_tables is None
+
+    rng = np.random.default_rng(1)
+    X_test = np.vstack([X, np.column_stack([
+        rng.normal(250, 80, 300),
+        rng.normal(10000, 4000, 300),
+        rng.uniform(0, 1500, 300),
+        rng.integers(0, 24, 300)
+    ])])
+    expected = model.predict_proba(scaler.transform(X_test))[:, 1]
+    np.testing.assert_allclose(compact.predict_proba(X_test, batch_size=128), expected, atol=1e-12)
+
+def test_export_writes_complete_artifact(tmp_path):
+    model, scaler, _ = _train(n_samples=100)
+    assert not compact_model_exists(tmp_path)
+    export_compact_model(model, scaler, FEATURES, tmp_path)
+    assert compact_model_exists(tmp_path)
+
+def test_stale_artifact_is_detected(tmp_path):
+    model, scaler, _ = _train(n_samples=100)
+    model_path, scaler_path = tmp_path / "model.pkl", tmp_path / "model_scaler.pkl"
+    joblib.dump(model, model_path)
+    joblib.dump(scaler, scaler_path)
+    compact_dir = tmp_path / "compact"
+    export_compact_model(model, scaler, FEATURES, compact_dir, source_fingerprint([model_path, scaler_path]))
+    assert compact_model_matches(compact_dir, [model_path, scaler_path])
+
+    # Retraining replaces the pickle, so the exported arrays no longer match it
+    retrained, _, _ = _train(seed=5, n_samples=100)
+    joblib.dump(retrained, model_path)
+    assert not compact_model_matches(compact_dir, [model_path, scaler_path])
+
+def test_missing_pickles_keep_compact_model(tmp_path):
+    model, scaler, _ = _train(n_samples=100)
+    export_compact_model(model, scaler, FEATURES, tmp_path)
+    assert compact_model_matches(tmp_path, [tmp_path / "missing.pkl", tmp_path / "missing_scaler.pkl"])
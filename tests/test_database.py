@@ -0,0 +1,39 @@
+import pytest
+
+pytest.importorskip("dotenv")
+pd = pytest.importorskip("pandas")
+
+def _flight(icao24, latitude, altitude=10000.0):
+    return {'icao24': icao24, 'callsign': icao24.upper(), 'origin_country': 'France',
+            'longitude': 2.0, 'latitude': latitude, 'altitude': altitude, 'velocity': 230.0,
+            'heading': 90.0, 'timestamp': 1700000000, 'on_ground': False}
+
+def _store_poll(db, flights, fetched_at):
+    poll_id = db.create_snapshot('Europe', [35, 72, -25, 45], len(flights), fetched_at)
+    db.store_flight_data(flights, poll_id)
+    return poll_id
+
+def test_snapshot_keeps_fetch_time(db):
+    poll_id = _store_poll(db, [_flight('aaa111', 48.0)], fetched_at=1700000000)
+    snapshots = db.get_snapshots()
+    assert snapshots.loc[snapshots['poll_id'] == poll_id, 'fetched_at'].item() == 1700000000
+
+def test_load_snapshot_joins_predictions_of_the_same_poll(db):
+    first = _store_poll(db, [_flight('aaa111', 48.0)], fetched_at=1700000000)
+    second = _store_poll(db, [_flight('aaa111', 48.5)], fetched_at=1700000010)
+    db.store_predictions(first, pd.DataFrame({'icao24': ['aaa111'], 'delay_probability': [0.25]}))
+    db.store_predictions(second, pd.DataFrame({'icao24': ['aaa111'], 'delay_probability': [0.75]}))
+
+    loaded = db.load_snapshot(second)
+    assert len(loaded) == 1
+    assert loaded['latitude'].item() == 48.5
+    assert loaded['delay_probability'].item() == 0.75
+
+def test_diff_snapshots_reports_added_removed_and_changed(db):
+    old = _store_poll(db, [_flight('aaa111', 48.0), _flight('bbb222', 45.0), _flight('ccc333', 50.0)],
+                      fetched_at=1700000000)
+    new = _store_poll(db, [_flight('aaa111', 48.0), _flight('bbb222', 45.5), _flight('ddd444', 52.0)],
+                      fetched_at=1700000010)
+
+    statuses = db.diff_snapshots(old, new).set_index('icao24')['status'].to_dict()
+    assert statuses == {'aaa111': 'unchanged', 'bbb222': 'changed', 'ccc333': 'removed', 'ddd444': 'added'}
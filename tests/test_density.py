@@ -0,0 +1,40 @@
+import pytest
+
+pytest.importorskip("dotenv")
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from density import DensityGrid
+
+def _frame(points, delay=0.5):
+    return pd.DataFrame({
+        'latitude': [p[0] for p in points],
+        'longitude': [p[1] for p in points],
+        'delay_probability': [delay] * len(points)
+    })
+
+def test_levels_over_the_cell_cap_are_not_kept():
+    grid = DensityGrid([35.0, 72.0, -25.0, 45.0], cell_sizes=[1.0, 0.5, 0.25, 0.1], max_cells=20000)
+    assert grid.cell_sizes == [1.0, 0.5]
+    assert set(grid.current) == {1.0, 0.5}
+
+def test_worldwide_box_gets_one_level_that_fits():
+    grid = DensityGrid([-90.0, 90.0, -180.0, 180.0], cell_sizes=[1.0, 0.5], max_cells=20000)
+    assert len(grid.cell_sizes) == 1
+    n_lat, n_lon = grid.shapes[grid.cell_sizes[0]]
+    assert n_lat * n_lon <= 20000
+
+def test_current_and_history_counts():
+    grid = DensityGrid([40.0, 50.0, 0.0, 10.0], cell_sizes=[1.0], history_window=100)
+    grid.update(_frame([(45.5, 5.5), (45.6, 5.6), (41.5, 1.5)]), timestamp=1000)
+    current = grid.frame(1.0)
+    assert current['count'].sum() == 3
+    assert current.loc[current['count'].idxmax(), 'latitude'] == 45.5
+
+    grid.update(_frame([(45.5, 5.5)]), timestamp=1050)
+    assert grid.frame(1.0, window='history')['count'].sum() == pytest.approx(4 / 2)
+
+    # The first snapshot falls out of the window
+    grid.update(_frame([(45.5, 5.5)]), timestamp=1150)
+    assert grid.total_snapshots == 2
+    assert grid.frame(1.0, window='history')['count'].sum() == pytest.approx(2 / 2)
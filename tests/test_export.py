@@ -0,0 +1,50 @@
+import pytest
+
+pytest.importorskip("dotenv")
+pd = pytest.importorskip("pandas")
+
+from export import export_table, table_query
+
+def _flights():
+    return pd.DataFrame({
+        'icao24': ['abc123', 'def456', 'ghi789'],
+        'callsign': ['AFR1', 'DLH2', 'BAW3'],
+        'origin_country': ['France', 'Germany', 'United Kingdom'],
+        'longitude': [2.5, 8.5, -0.5],
+        'latitude': [48.5, 50.0, 51.5],
+        'altitude': [10000.0, 3000.0, 11000.0],
+        'velocity': [230.0, 120.0, 240.0],
+        'heading': [90.0, 180.0, 270.0],
+        'timestamp': [1700000000, 1700000005, 1700000010],
+        'on_ground': [False, False, False]
+    })
+
+def test_table_query_rejects_filters_a_table_cannot_apply():
+    with pytest.raises(ValueError):
+        table_query('snapshots', bounds=[0, 1, 0, 1])
+    with pytest.raises(ValueError):
+        table_query('alerts', country='France')
+
+def test_export_applies_bounds_filters_and_limit(db, tmp_path):
+    db.store_flight_data(_flights())
+    out = tmp_path / 'flights.csv'
+
+    assert export_table('flights', out, bounds=[45, 52, 0, 10]) == 2
+    assert export_table('flights', out, bounds=[45, 52, 0, 10], min_altitude=5000) == 1
+    assert list(pd.read_csv(out)['icao24']) == ['abc123']
+    assert export_table('flights', out, country='kingdom') == 1
+    assert export_table('flights', out, limit=2) == 2
+
+def test_parquet_export_uses_declared_types(db, tmp_path):
+    pytest.importorskip("pyarrow")
+    out = tmp_path / 'flights.parquet'
+
+    # No rows still writes a readable file with the table's columns
+    assert export_table('flights', out, 'parquet') == 0
+    assert 'poll_id' in pd.read_parquet(out).columns
+
+    # Rows stored without a poll ID are all NULL, which must not decide the column type
+    db.store_flight_data(_flights())
+    db.store_flight_data(_flights(), poll_id=7)
+    assert export_table('flights', out, 'parquet', chunksize=3) == 6
+    assert pd.read_parquet(out)['poll_id'].dropna().tolist() == [7, 7, 7]
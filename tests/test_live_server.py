@@ -0,0 +1,57 @@
+import threading
+import pytest
+
+pytest.importorskip("dotenv")
+pd = pytest.importorskip("pandas")
+
+from live_server import DeltaBroadcaster, LiveUpdateHub
+
+def _frame(*aircraft):
+    return pd.DataFrame([
+        {'icao24': icao24, 'callsign': f"TST{icao24.upper()}", 'latitude': lat, 'longitude': lon,
+         'altitude': 10000.0, 'velocity': 230.0, 'heading': 90.0, 'delay_probability': 0.1}
+        for icao24, lat, lon in aircraft
+    ])
+
+class Snapshot:
+    def __init__(self, fetched_at, flights=()):
+        self.fetched_at = fetched_at
+        self.flights = list(flights)
+
+def test_publish_sends_only_changes():
+    broadcaster = DeltaBroadcaster()
+    assert broadcaster.publish(_frame(('a', 48.0, 2.0), ('b', 45.0, 5.0))) == (2, 0)
+
+    # 'a' unchanged, 'b' moved, 'c' appeared
+    assert broadcaster.publish(_frame(('a', 48.0, 2.0), ('b', 45.1, 5.0), ('c', 40.0, 1.0))) == (2, 0)
+    delta = broadcaster.history[-1]
+    assert set(delta['upserts']) == {'b', 'c'}
+
+    assert broadcaster.publish(_frame(('c', 40.0, 1.0))) == (0, 2)
+    assert sorted(broadcaster.history[-1]['removed']) == ['a', 'b']
+
+def test_deltas_since():
+    broadcaster = DeltaBroadcaster(history_size=2)
+    for lat in (1.0, 2.0, 3.0):
+        broadcaster.publish(_frame(('a', lat, 0.0)))
+    assert broadcaster.deltas_since(broadcaster.version) == []
+    assert [d['version'] for d in broadcaster.deltas_since(2)] == [3]
+    # Too far behind the kept history: the client needs a full snapshot
+    assert broadcaster.deltas_since(0) is None
+    assert broadcaster.snapshot()['aircraft']['a']['latitude'] == 3.0
+
+def test_snapshot_is_published_once_across_threads():
+    published = []
+    hub = LiveUpdateHub(None, lambda flights: _frame(('a', 48.0, 2.0)),
+                        on_publish=lambda name, snapshot, df: published.append((name, snapshot.fetched_at)))
+    snapshot = Snapshot(1000)
+
+    threads = [threading.Thread(target=hub.publish_snapshot, args=("France", snapshot)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert published == [("France", 1000)]
+    assert hub.broadcaster("France").version == 1
+    assert hub.publish_snapshot("France", Snapshot(1060))
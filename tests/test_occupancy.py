@@ -0,0 +1,63 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from occupancy import SectorOccupancy, points_in_polygon
+
+SQUARE = [[0, 0], [0, 2], [2, 2], [2, 0]]
+
+def _poll(*aircraft):
+    return pd.DataFrame(aircraft, columns=['icao24', 'latitude', 'longitude', 'altitude', 'on_ground'])
+
+def _occupancy(**kwargs):
+    # 2x2 one-degree cells, a single band up to FL660
+    return SectorOccupancy([0, 2, 0, 2], cell_size=1.0, fl_bands=[0, 660], sectors=[], **kwargs)
+
+def _by_sector(occupancy):
+    return occupancy.current().set_index('sector')[['count', 'entries', 'exits']].to_dict('index')
+
+def test_points_in_polygon():
+    lat = np.array([1.0, 3.0, 0.5])
+    lon = np.array([1.0, 1.0, 1.5])
+    assert points_in_polygon(lat, lon, SQUARE).tolist() == [True, False, True]
+
+def test_first_poll_has_no_entries():
+    # Without a previous poll there is nothing to compare against
+    occupancy = _occupancy()
+    occupancy.update(_poll(('a', 0.5, 0.5, 3000, False), ('b', 0.5, 0.6, 3000, False)), timestamp=1000)
+    assert _by_sector(occupancy) == {'0,0 FL000-660': {'count': 2, 'entries': 0, 'exits': 0}}
+
+def test_moving_and_vanishing_aircraft_are_entries_and_exits():
+    occupancy = _occupancy()
+    occupancy.update(_poll(('a', 0.5, 0.5, 3000, False), ('b', 0.5, 0.6, 3000, False),
+                           ('c', 1.5, 1.5, 3000, False)), timestamp=1000)
+    # a moves east, b stays, c vanishes, d appears
+    occupancy.update(_poll(('a', 0.5, 1.5, 3000, False), ('b', 0.5, 0.6, 3000, False),
+                           ('d', 1.5, 0.5, 3000, False)), timestamp=1010)
+
+    assert _by_sector(occupancy) == {
+        '0,0 FL000-660': {'count': 1, 'entries': 0, 'exits': 1},
+        '0,1 FL000-660': {'count': 1, 'entries': 1, 'exits': 0},
+        '1,0 FL000-660': {'count': 1, 'entries': 1, 'exits': 0},
+        '1,1 FL000-660': {'count': 0, 'entries': 0, 'exits': 1},
+    }
+
+def test_polygon_sectors_are_counted_alongside_the_grid():
+    sectors = [{'name': 'LOW', 'polygon': SQUARE, 'lower_fl': 0, 'upper_fl': 100}]
+    occupancy = SectorOccupancy([0, 2, 0, 2], cell_size=1.0, fl_bands=[0, 660], sectors=sectors)
+    occupancy.update(_poll(('a', 0.5, 0.5, 1000, False), ('b', 1.5, 1.5, 10000, False)), timestamp=1000)
+    assert _by_sector(occupancy)['LOW'] == {'count': 1, 'entries': 0, 'exits': 0}
+    assert occupancy.totals()['aircraft'].tolist() == [2]
+
+def test_rollups_close_when_the_interval_ends():
+    occupancy = _occupancy(rollup_interval=60)
+    occupancy.update(_poll(('a', 0.5, 0.5, 3000, False)), timestamp=0)
+    occupancy.update(_poll(('a', 0.5, 0.5, 3000, False), ('b', 0.5, 0.5, 3000, False)), timestamp=30)
+    assert occupancy.flush_rollups() == []
+
+    occupancy.update(_poll(('a', 0.5, 0.5, 3000, False)), timestamp=60)
+    rollups = occupancy.flush_rollups()
+    assert rollups == [{'sector': '0,0 FL000-660', 'bucket_start': 0, 'polls': 2, 'mean_count': 1.5,
+                        'max_count': 2, 'entries': 1, 'exits': 0}]
+    assert occupancy.flush_rollups() == []
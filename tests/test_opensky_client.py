@@ -0,0 +1,58 @@
+import threading
+import time
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("requests")
+pytest.importorskip("pandas")
+
+import opensky_client
+from opensky_client import OpenSkyClient, RequestBudget
+
+def test_budget_limits_requests_per_hour():
+    budget = RequestBudget(requests_per_hour=2)
+    assert budget.try_acquire()
+    assert budget.try_acquire()
+    assert not budget.try_acquire()
+
+def test_rate_limit_wait_does_not_hold_the_lock():
+    client = OpenSkyClient()
+    client.auth = None
+    client.min_request_interval = 0.3
+    client.last_request_time = time.time()
+
+    waiter = threading.Thread(target=client._wait_for_rate_limit)
+    waiter.start()
+    time.sleep(0.05)
+    # While the first caller sleeps for its slot, others can still reserve theirs
+    assert client._rate_lock.acquire(timeout=0.05)
+    client._rate_lock.release()
+    waiter.join()
+
+def test_track_requests_are_capped_separately(monkeypatch):
+    monkeypatch.setattr(opensky_client, 'get_cached_tracks', lambda icao24_list, max_age=None: {})
+    monkeypatch.setattr(opensky_client, 'store_tracks', lambda tracks: True)
+
+    client = OpenSkyClient()
+    client.auth = ('user', 'password')
+    client.budget = RequestBudget(requests_per_hour=100)
+    client.track_budget = RequestBudget(requests_per_hour=2)
+    client.get_flight_details = lambda icao24: {'icao24': icao24, 'path': [[0, 48.0, 2.0, 10000, 90, False]]}
+
+    tracks = client.get_tracks(['a', 'b', 'c', 'd'])
+    assert len(tracks) == 2
+    # Polling keeps the rest of the shared budget
+    assert len(client.budget._request_times) == 2
+
+def test_track_slot_is_returned_when_the_shared_budget_refuses(monkeypatch):
+    monkeypatch.setattr(opensky_client, 'get_cached_tracks', lambda icao24_list, max_age=None: {})
+    monkeypatch.setattr(opensky_client, 'store_tracks', lambda tracks: True)
+
+    client = OpenSkyClient()
+    client.auth = ('user', 'password')
+    client.budget = RequestBudget(requests_per_hour=0)
+    client.track_budget = RequestBudget(requests_per_hour=2)
+    client.get_flight_details = lambda icao24: {'icao24': icao24, 'path': [[0, 48.0, 2.0, 10000, 90, False]]}
+
+    assert client.get_tracks(['a', 'b', 'c']) == {}
+    assert len(client.track_budget._request_times) == 0
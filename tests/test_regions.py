@@ -0,0 +1,105 @@
+import pytest
+
+pytest.importorskip("dotenv")
+
+from regions import Region, RegionScheduler, custom_region_name
+
+class FakeBudget:
+    def __init__(self, remaining=100):
+        self.remaining = remaining
+
+    def try_acquire(self):
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+class FakeClient:
+    def __init__(self, responses=None):
+        self.budget = FakeBudget()
+        self.requests = []
+        self.responses = list(responses or [])
+
+    def get_states(self, bounds):
+        self.requests.append(list(bounds))
+        if self.responses:
+            return self.responses.pop(0)
+        # One aircraft in the middle of the requested box
+        return [{'icao24': 'abc123', 'latitude': (bounds[0] + bounds[1]) / 2,
+                 'longitude': (bounds[2] + bounds[3]) / 2}]
+
+def _scheduler(client, *regions):
+    return RegionScheduler(client, regions=list(regions))
+
+def test_covered_region_reuses_container_fetch():
+    client = FakeClient()
+    big = Region("Big", [40, 60, 0, 20], refresh_interval=60, priority=5)
+    small = Region("Small", [45, 55, 5, 15], refresh_interval=60)
+    scheduler = _scheduler(client, big, small)
+
+    scheduler.refresh()
+    assert client.requests == [big.bounds]
+    assert scheduler.snapshots["Small"].source_region == "Big"
+    assert len(scheduler.snapshots["Small"].flights) == 1
+
+def test_snapshot_is_served_until_due():
+    client = FakeClient()
+    scheduler = _scheduler(client, Region("A", [40, 50, 0, 10], refresh_interval=60))
+    first = scheduler.get_snapshot("A")
+    assert scheduler.get_snapshot("A") is first
+    assert len(client.requests) == 1
+
+def test_failed_request_keeps_previous_snapshot():
+    client = FakeClient()
+    scheduler = _scheduler(client, Region("A", [40, 50, 0, 10], refresh_interval=60))
+    first = scheduler.get_snapshot("A")
+    first.fetched_at -= 120  # make it due
+
+    client.responses = [None]
+    assert scheduler.get_snapshot("A") is first
+    # The failed region is not retried on every call
+    assert scheduler.get_snapshot("A") is first
+    assert len(client.requests) == 2
+
+def test_exhausted_budget_keeps_previous_snapshot():
+    client = FakeClient()
+    scheduler = _scheduler(client, Region("A", [40, 50, 0, 10], refresh_interval=0))
+    first = scheduler.get_snapshot("A")
+    client.budget.remaining = 0
+    assert scheduler.get_snapshot("A") is first
+
+def test_bounds_change_drops_snapshots():
+    client = FakeClient()
+    scheduler = _scheduler(client, Region("A", [40, 60, 0, 20], refresh_interval=600, priority=5),
+                           Region("B", [45, 55, 5, 15], refresh_interval=600))
+    scheduler.refresh()
+    assert scheduler.snapshots["B"].source_region == "A"
+
+    scheduler.add_region(Region("A", [0, 10, 0, 10], refresh_interval=600, priority=5))
+    assert "A" not in scheduler.snapshots
+    assert "B" not in scheduler.snapshots  # derived from the old box
+
+def test_custom_regions_are_keyed_per_box():
+    scheduler = _scheduler(FakeClient())
+    first = scheduler.custom_region([40, 50, 0, 10])
+    second = scheduler.custom_region([41, 51, 1, 11])
+    assert first.name == custom_region_name([40, 50, 0, 10])
+    assert first.name != second.name
+    assert scheduler.custom_region([40.0, 50.0, 0.0, 10.0]) is first
+
+def test_least_recently_requested_custom_regions_are_removed():
+    scheduler = _scheduler(FakeClient())
+    names = [scheduler.custom_region([i, i + 1, 0, 1], max_custom=2).name for i in range(3)]
+    assert names[0] not in scheduler.regions
+    assert names[1] in scheduler.regions and names[2] in scheduler.regions
+
+def test_on_fetch_gets_the_snapshot_fetch_time():
+    calls = []
+    def on_fetch(region, flights, fetched_at):
+        calls.append(fetched_at)
+        return 42
+    scheduler = RegionScheduler(FakeClient(), regions=[Region("A", [40, 50, 0, 10])], on_fetch=on_fetch)
+
+    snapshot = scheduler.get_snapshot("A")
+    assert calls == [snapshot.fetched_at]
+    assert snapshot.poll_id == 42
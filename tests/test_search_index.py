@@ -0,0 +1,33 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from search_index import FlightSearchIndex
+
+def _index():
+    return FlightSearchIndex(pd.DataFrame({
+        'callsign': ['AFR123 ', 'afr9', 'DLH400', None, 'BAW123'],
+        'origin_country': ['France', 'France', 'Germany', 'Germany', 'United Kingdom']
+    }))
+
+def _naive_substring(callsigns, term):
+    return [i for i, c in enumerate(callsigns) if term.upper() in (c or '').strip().upper()]
+
+def test_exact_and_prefix_are_case_and_whitespace_insensitive():
+    index = _index()
+    assert index.exact('afr123').tolist() == [0]
+    assert index.prefix('AFR').tolist() == [0, 1]
+    assert index.prefix('ZZZ').tolist() == []
+
+@pytest.mark.parametrize('term', ['', '12', '123', 'R12', 'AFR1', 'H40', 'XYZ'])
+def test_substring_matches_a_linear_scan(term):
+    callsigns = ['AFR123 ', 'afr9', 'DLH400', None, 'BAW123']
+    assert _index().substring(term).tolist() == _naive_substring(callsigns, term)
+
+def test_country_and_search():
+    index = _index()
+    assert index.country('germ').tolist() == [2, 3]
+    assert index.country('Spain').tolist() == []
+    # Callsign matches and country matches are combined
+    assert index.search('AN').tolist() == [0, 1, 2, 3]
@@ -0,0 +1,44 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from snapshot import AircraftRecord, SnapshotHistory, compact_snapshot
+
+def _frame():
+    return pd.DataFrame({
+        'icao24': ['abc123', 'def456'],
+        'callsign': ['AFR1', None],
+        'origin_country': ['France', 'France'],
+        'latitude': [48.5, 45.25],
+        'longitude': [2.5, 5.75],
+        'altitude': [10000.0, 3000.0],
+        'velocity': [230.0, 120.0],
+        'on_ground': [False, True],
+        'timestamp': [1700000000, 1700000005],
+        'delay_probability': [0.25, 0.75]
+    })
+
+def test_compact_snapshot_dtypes():
+    df = compact_snapshot(_frame())
+    assert df['latitude'].dtype == np.float32
+    assert df['origin_country'].dtype == 'category'
+    assert df['timestamp'].dtype == np.uint32
+    assert df['callsign'].tolist() == ['AFR1', None]
+
+def test_records_match_rows():
+    df = compact_snapshot(_frame())
+    records = list(AircraftRecord.iter_snapshot(df))
+    assert [r.icao24 for r in records] == ['abc123', 'def456']
+    assert records[1].to_dict() == AircraftRecord.from_snapshot(df, 1).to_dict()
+    assert records[0].origin_country == 'France'
+    assert records[0].likely_destination is None  # column not in the snapshot
+
+def test_history_returns_stored_frames_until_evicted():
+    history = SnapshotHistory(max_snapshots=2)
+    frames = [_frame() for _ in range(3)]
+    for fetched_at, df in enumerate(frames):
+        history.add("Europe", fetched_at, df)
+    assert history.get("Europe", 0) is None
+    assert history.get("Europe", 2) is frames[2]
+    assert history.get("Asia", 2) is None